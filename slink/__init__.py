@@ -1,2 +1,5 @@
 from .api import *
 from .decorators import *
+from .hedging import *
+from .scheduling import *
+from .replay import *
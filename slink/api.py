@@ -1,17 +1,137 @@
-from typing import Dict, List, Optional, Protocol, Generator, Tuple, Union
+from collections import OrderedDict
+from concurrent import futures
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Generator,
+    Tuple,
+    Type,
+    Union,
+)
 from urllib.parse import urljoin, urlparse
+from pydantic import BaseModel
+from pydantic.fields import MAPPING_LIKE_SHAPES
 import requests
+import requests.adapters
 import inspect
+import logging
+import os
+import threading
+import weakref
+from .replay import Cassette, RecordingAdapter, ReplayAdapter
+from .scheduling import Scheduler
+
+logger = logging.getLogger("slink")
+
+
+class Metrics:
+    """
+    Thread-safe counters and gauges for an Api, keyed by name, eg "<endpoint>.<metric>" or "lane.<lane>.<metric>".
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: Dict[str, float] = {}
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self._values[name] = value
+
+    def __getitem__(self, name: str) -> float:
+        with self._lock:
+            return self._values.get(name, 0)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        """
+        Clear every value. Also safe to call in a forked child while another thread of the parent held the lock.
+        """
+        self._lock = threading.Lock()
+        self._values = {}
+
+
+class ResourceVersion:
+    def __init__(self, document: Any, etag: Optional[str] = None) -> None:
+        self.document = document
+        self.etag = etag
 
 
 class Api:
-    def __init__(self, base_url="", session: Optional[requests.Session] = None) -> None:
+    def __init__(
+        self,
+        base_url="",
+        session: Optional[requests.Session] = None,
+        scheduler: Optional[Scheduler] = None,
+        warm_connections: int = 0,
+        max_buffered_bytes: Optional[int] = None,
+        max_tracked_versions: int = 1000,
+    ) -> None:
         parsed_url = urlparse(base_url)
         if parsed_url.scheme == "":
             raise Exception(f"base_url '{base_url}' is missing scheme")
-        self.session = session if session else requests.Session()
+        if session is None:
+            session = requests.Session()
+            if scheduler is not None:
+                # size the connection pool to match the scheduler
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=scheduler.capacity)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+        self.session = session
+        self.scheduler = scheduler
         self.base_url = base_url
-        self._response: Optional[requests.Response] = None
+        # the current response and projection are per thread, so one Api can be shared between threads
+        self._local = threading.local()
+        self.metrics = Metrics()
+        # last known version of resources fetched by @get(track=True), by url, oldest first
+        self._versions: "OrderedDict[str, ResourceVersion]" = OrderedDict()
+        self._versions_lock = threading.Lock()
+        self.max_tracked_versions = max_tracked_versions
+        # connections to open in the background in each forked child
+        self.warm_connections = warm_connections
+        # bytes of page bodies held by bounded @get_pages iterations
+        self.max_buffered_bytes = max_buffered_bytes
+        self._buffer_condition = threading.Condition()
+        self._buffered_bytes = 0
+        # the adapter mounted for base_url before replay(), if any
+        self._before_replay: Optional[requests.adapters.BaseAdapter] = None
+        _apis.add(self)
+
+    def project(self, document: Any) -> Any:
+        """
+        Drop the fields of `document` (or of each document in a list) that the current endpoint's Projection didn't
+        ask for, before decoding it.
+        """
+        if self._projection is None:
+            return document
+        return self._projection.project(document)
+
+    @property
+    def _response(self) -> Optional[requests.Response]:
+        return getattr(self._local, "response", None)
+
+    @_response.setter
+    def _response(self, response: Optional[requests.Response]) -> None:
+        self._local.response = response
+
+    @property
+    def _projection(self) -> Optional["Projection"]:
+        return getattr(self._local, "projection", None)
+
+    @_projection.setter
+    def _projection(self, projection: Optional["Projection"]) -> None:
+        self._local.projection = projection
 
     @property
     def response(self) -> requests.Response:
@@ -20,6 +140,211 @@ class Api:
         else:
             raise Exception("No current response!")
 
+    def tracked_version(self, url: str) -> Optional[ResourceVersion]:
+        with self._versions_lock:
+            return self._versions.get(url)
+
+    def track_version(self, url: str, version: ResourceVersion) -> None:
+        """
+        Remember `version` as the last known version of the resource at `url`, forgetting the least recently tracked
+        resource once more than max_tracked_versions are known.
+        """
+        with self._versions_lock:
+            self._versions[url] = version
+            self._versions.move_to_end(url)
+            while len(self._versions) > self.max_tracked_versions:
+                self._versions.popitem(last=False)
+
+    def forget_versions(self, url: Optional[str] = None) -> None:
+        """
+        Forget the last known version of the resource at `url`, or of every resource.
+        """
+        with self._versions_lock:
+            if url is None:
+                self._versions.clear()
+            else:
+                self._versions.pop(url, None)
+
+    def warm(self, connections: int = 1) -> None:
+        """
+        Open `connections` pooled connections to base_url ahead of the first real requests, by sending concurrent HEAD
+        requests through the session. Failures are logged rather than raised.
+        """
+
+        def head() -> None:
+            try:
+                self.session.head(self.base_url)
+            except requests.RequestException as e:
+                logger.warning(f"Failed to warm connection to {self.base_url}: {e}")
+
+        with futures.ThreadPoolExecutor(max_workers=connections) as executor:
+            for _ in range(connections):
+                executor.submit(head)
+
+    def _start_warming(self) -> None:
+        if self.warm_connections > 0:
+            threading.Thread(
+                target=self.warm,
+                args=(self.warm_connections,),
+                name="slink-warm",
+                daemon=True,
+            ).start()
+
+    def _after_fork(self) -> None:
+        """
+        Called in a forked child, which shares the parent's pooled sockets and may have inherited locks held by threads
+        that no longer exist: replace the connection pools, metrics and scheduler state, then warm if configured.
+        """
+        for adapter in set(self.session.adapters.values()):
+            if isinstance(adapter, requests.adapters.HTTPAdapter):
+                # the same reinitialisation as unpickling, building fresh pools in place, so subclass state is kept
+                adapter.__setstate__(adapter.__getstate__())  # type: ignore[attr-defined]
+        self.metrics.reset()
+        self._versions_lock = threading.Lock()
+        self._buffer_condition = threading.Condition()
+        self._buffered_bytes = 0
+        if self.scheduler is not None:
+            self.scheduler._reset()
+        self._start_warming()
+
+    @contextmanager
+    def record(self, path: str) -> Iterator[Cassette]:
+        """
+        Record every response from base_url made inside the block, saving them as a cassette at `path` (gzipped if it
+        ends in .gz) for replay().
+        """
+        cassette = Cassette()
+        previous = self.session.adapters.get(self.base_url)
+        adapter = RecordingAdapter(cassette, self.session.get_adapter(self.base_url))
+        self.session.mount(self.base_url, adapter)
+        try:
+            yield cassette
+        finally:
+            if previous is not None:
+                self.session.mount(self.base_url, previous)
+            else:
+                self.session.adapters.pop(self.base_url)
+            cassette.save(path)
+
+    def replay(self, cassette: Union[str, Cassette], **kwargs) -> ReplayAdapter:
+        """
+        Serve requests to base_url from a recorded cassette instead of the network. Keyword arguments configure the
+        ReplayAdapter's latency, bandwidth and error rate.
+        """
+        if isinstance(cassette, str):
+            cassette = Cassette.load(cassette)
+        adapter = ReplayAdapter(cassette, **kwargs)
+        if not isinstance(self.session.adapters.get(self.base_url), ReplayAdapter):
+            self._before_replay = self.session.adapters.get(self.base_url)
+        self.session.mount(self.base_url, adapter)
+        return adapter
+
+    def stop_replaying(self) -> None:
+        """
+        Send requests to base_url over the network again after replay().
+        """
+        if not isinstance(self.session.adapters.get(self.base_url), ReplayAdapter):
+            raise Exception("Not replaying")
+        if self._before_replay is not None:
+            self.session.mount(self.base_url, self._before_replay)
+        else:
+            self.session.adapters.pop(self.base_url)
+        self._before_replay = None
+
+    @contextmanager
+    def lane(self, name: str) -> Iterator[None]:
+        """
+        Send requests made by this thread inside the block through the named scheduler lane, overriding the lane
+        given to the endpoint decorators.
+        """
+        previous = getattr(self._local, "lane", None)
+        self._local.lane = name
+        try:
+            yield
+        finally:
+            self._local.lane = previous
+
+    def current_lane(self, endpoint_lane: Optional[str] = None) -> Optional[str]:
+        lane = getattr(self._local, "lane", None)
+        return lane if lane is not None else endpoint_lane
+
+    @contextmanager
+    def page_limit(self, pages: Optional[int]) -> Iterator[None]:
+        """
+        Stop @get_pages iterations started by this thread inside the block after `pages` pages, without requesting the
+        next one. None means no limit.
+        """
+        previous = getattr(self._local, "page_limit", None)
+        self._local.page_limit = pages
+        try:
+            yield
+        finally:
+            self._local.page_limit = previous
+
+    def current_page_limit(self) -> Optional[int]:
+        return getattr(self._local, "page_limit", None)
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        lane: Optional[str] = None,
+        buffered: bool = False,
+        **kwargs,
+    ) -> requests.Response:
+        if buffered:
+            # wait for room before taking a scheduler slot or a connection, which other iterations may need to finish
+            self._wait_for_buffer()
+        if self.scheduler is None:
+            return self._request(method, url, buffered, **kwargs)
+        with self.scheduler.slot(lane, self.metrics):
+            return self._request(method, url, buffered, **kwargs)
+
+    def _request(
+        self, method: str, url: str, buffered: bool, **kwargs
+    ) -> requests.Response:
+        response = self.session.request(method=method, url=url, **kwargs)
+        if buffered:
+            self._reserve_buffer(len(response.content))
+        return response
+
+    def _wait_for_buffer(self) -> None:
+        cap = self.max_buffered_bytes
+        if cap is None:
+            return
+        with self._buffer_condition:
+            # a thread already holding a page doesn't wait, as it may be the only one that can release it
+            while (
+                self._buffered_bytes >= cap
+                and getattr(self._local, "buffered_bytes", 0) == 0
+            ):
+                self._buffer_condition.wait()
+
+    def _reserve_buffer(self, num_bytes: int) -> None:
+        with self._buffer_condition:
+            self._buffered_bytes += num_bytes
+            self._local.buffered_bytes = (
+                getattr(self._local, "buffered_bytes", 0) + num_bytes
+            )
+            self.metrics.set("buffered_bytes", self._buffered_bytes)
+
+    def _release_buffer(self, num_bytes: int) -> None:
+        with self._buffer_condition:
+            self._buffered_bytes -= num_bytes
+            self._local.buffered_bytes = (
+                getattr(self._local, "buffered_bytes", 0) - num_bytes
+            )
+            self.metrics.set("buffered_bytes", self._buffered_bytes)
+            self._buffer_condition.notify_all()
+
+    def _release_response(self, response: requests.Response) -> None:
+        """
+        Drop the body of a bounded page, keeping only its status, headers and url.
+        """
+        self._release_buffer(len(response.content))
+        response._content = b""
+        response.close()
+
     def check_signature(self, signature: inspect.Signature, args, kwargs):
         signature.bind(self, *args, **kwargs)
 
@@ -37,6 +362,22 @@ class Api:
         )
 
 
+_apis: "weakref.WeakSet[Api]" = weakref.WeakSet()
+
+
+def _reset_apis_after_fork() -> None:
+    for api in list(_apis):
+        # one failing Api mustn't leave the rest sharing the parent's sockets
+        try:
+            api._after_fork()
+        except Exception:
+            logger.exception(f"Failed to reset {api!r} after fork")
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_apis_after_fork)
+
+
 class Query:
     def __init__(self, alias: str = ""):
         self.alias = alias
@@ -46,6 +387,82 @@ class Body:
     pass
 
 
+def _model_fields(
+    model: Type[BaseModel],
+    separator: str,
+    prefix: str = "",
+    path: Tuple[Type[BaseModel], ...] = (),
+) -> List[str]:
+    fields = []
+    for field in model.__fields__.values():
+        # a mapping's keys aren't field names, and a model already on the path would recurse forever, so both are
+        # requested whole
+        if (
+            inspect.isclass(field.type_)
+            and issubclass(field.type_, BaseModel)
+            and field.shape not in MAPPING_LIKE_SHAPES
+            and field.type_ not in (*path, model)
+        ):
+            fields.extend(
+                _model_fields(
+                    field.type_,
+                    separator,
+                    f"{prefix}{field.alias}{separator}",
+                    (*path, model),
+                )
+            )
+        else:
+            fields.append(f"{prefix}{field.alias}")
+    return fields
+
+
+class Projection:
+    """
+    Request a sparse fieldset, eg `fields=Projection(model=MyResource)` adds `fields=name,value` to the query. Fields are
+    either listed explicitly or taken from a pydantic model, with nested model fields joined by `nested_separator`.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[List[str]] = None,
+        model: Optional[Type[BaseModel]] = None,
+        alias: str = "",
+        separator: str = ",",
+        nested_separator: str = ".",
+    ):
+        if fields is None and model is None:
+            raise ValueError("Projection needs either fields or a model")
+        self.fields = (
+            fields
+            if fields is not None
+            else _model_fields(model, nested_separator)  # type: ignore
+        )
+        self.alias = alias
+        self.separator = separator
+        self.nested_separator = nested_separator
+        self._tree: dict = {}
+        for field in self.fields:
+            node = self._tree
+            for part in field.split(nested_separator):
+                node = node.setdefault(part, {})
+
+    @property
+    def value(self) -> str:
+        return self.separator.join(self.fields)
+
+    def project(self, document: Any, tree: Optional[dict] = None) -> Any:
+        tree = self._tree if tree is None else tree
+        if isinstance(document, list):
+            return [self.project(item, tree) for item in document]
+        if not isinstance(document, dict) or not tree:
+            return document
+        return {
+            key: self.project(value, tree[key])
+            for key, value in document.items()
+            if key in tree
+        }
+
+
 class DecoratorParser:
     def __init__(self, kwargs) -> None:
         self.queryParams = {
@@ -54,6 +471,19 @@ class DecoratorParser:
             if type(v) == Query
         }
         self.bodyParams = [k for k, v in kwargs.items() if type(v) == Body]
+        projections = {
+            v.alias if len(v.alias) else k: v
+            for k, v in kwargs.items()
+            if type(v) == Projection
+        }
+        if len(projections) > 1:
+            raise Exception(
+                f"Can only have one Projection() argument (got {', '.join(projections)})"
+            )
+        self.projectionParam = ""
+        self.projection: Optional[Projection] = None
+        if projections:
+            self.projectionParam, self.projection = next(iter(projections.items()))
 
     def parse(self, args, kwargs) -> Tuple[Dict[str, str], List[str]]:
         if len(args):
@@ -63,6 +493,8 @@ class DecoratorParser:
             self.queryParams[k]: v for k, v in kwargs.items() if k in self.queryParams
         }
         body = [v for k, v in kwargs.items() if k in self.bodyParams]
+        if self.projection is not None:
+            params[self.projectionParam] = self.projection.value
 
         return params, body
 
@@ -75,3 +507,86 @@ PagerGeneratorType = Generator[
 class Pager(Protocol):
     def pages(self, url: str) -> PagerGeneratorType:  # type: ignore
         pass
+
+
+class AdaptivePageSize:
+    """
+    Page size for a pager that get_pages tunes during a scan to maximize items per second.
+
+    A pager opts in by exposing an instance as its `page_size` attribute. get_pages then sets the `param` query
+    parameter on every page request, so the pager should advance by the number of items actually returned rather than
+    by a fixed count. Pages that take longer than `target_latency` seconds, are bigger than `max_bytes`, fail with a
+    5xx or time out shrink the page size; otherwise the size climbs in whichever direction improves throughput. A
+    failed page is retried at the smaller size at most `max_retries` times, waiting `retry_delay` seconds before the
+    first retry and doubling the wait for each one after.
+    """
+
+    def __init__(
+        self,
+        param: str,
+        minimum: int,
+        maximum: int,
+        initial: Optional[int] = None,
+        target_latency: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        factor: float = 1.5,
+        max_retries: int = 3,
+        retry_delay: float = 0.1,
+    ) -> None:
+        if minimum < 1 or maximum < minimum:
+            raise ValueError(
+                f"Invalid page size bounds: minimum={minimum}, maximum={maximum}"
+            )
+        if factor <= 1:
+            raise ValueError(f"Page size factor must be greater than 1 (got {factor})")
+        if max_retries < 0 or retry_delay < 0:
+            raise ValueError(
+                f"Invalid page retries: max_retries={max_retries}, retry_delay={retry_delay}"
+            )
+        self.param = param
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.factor = factor
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.size = self._clamp(initial if initial is not None else minimum)
+        self.throughput = 0.0
+        self._growing = True
+        self._lock = threading.Lock()
+
+    def _clamp(self, size: float) -> int:
+        return max(self.minimum, min(self.maximum, int(size)))
+
+    def _step(self, grow: bool) -> None:
+        if grow:
+            self.size = self._clamp(max(self.size * self.factor, self.size + 1))
+        else:
+            self.size = self._clamp(min(self.size / self.factor, self.size - 1))
+
+    def apply(self, params: Optional[dict]) -> dict:
+        return {**(params or {}), self.param: self.size}
+
+    def record(self, items: int, seconds: float, num_bytes: int) -> None:
+        with self._lock:
+            throughput = items / seconds if seconds > 0 else 0.0
+            too_slow = self.target_latency is not None and seconds > self.target_latency
+            too_big = self.max_bytes is not None and num_bytes > self.max_bytes
+            if too_slow or too_big:
+                self._growing = False
+            elif throughput < self.throughput:
+                self._growing = not self._growing
+            self.throughput = throughput
+            self._step(self._growing)
+
+    def backoff(self) -> bool:
+        """
+        Shrink the page size after a failed page, returning False if it was already at the minimum.
+        """
+        with self._lock:
+            previous = self.size
+            self._growing = False
+            self.throughput = 0.0
+            self._step(grow=False)
+            return self.size != previous
@@ -0,0 +1,309 @@
+"""
+Drive a workload against an Api subclass and report throughput, latency, connection reuse and where the time went.
+
+    python -m slink.bench myproject.clients:MyApi workload.json --concurrency 8 --duration 30
+
+The workload is a JSON file such as
+
+    {
+        "base_url": "https://example.com/",
+        "endpoints": [
+            {"name": "get_resource", "weight": 3, "args": {"resource_key": ["A", "B", "C"]}},
+            {"name": "get_paginated", "max_pages": 10, "args": {"limit": {"randint": [1, 100]}}}
+        ]
+    }
+
+Endpoints are picked at random by weight. Each argument is a constant, a list to choose from, {"randint": [a, b]},
+{"uniform": [a, b]}, or {"call": "module:function"} for a function taking a random.Random. Paged endpoints are
+iterated for at most `max_pages` pages and `max_items` items. Command line options override the workload's
+"concurrency", "duration" and "base_url".
+"""
+
+import argparse
+import cProfile
+import importlib
+import itertools
+import json
+import pstats
+import random
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Type
+import requests.adapters
+from .api import Api
+
+
+def load_api_class(path: str) -> Type[Api]:
+    module_name, _, class_name = path.partition(":")
+    if not class_name:
+        raise ValueError(f"Expected module:class, got '{path}'")
+    api_class = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(api_class, type) and issubclass(api_class, Api)):
+        raise ValueError(f"'{path}' is not an Api subclass")
+    return api_class
+
+
+def _argument_generator(spec: Any) -> Callable[[random.Random], Any]:
+    if isinstance(spec, list):
+        return lambda rng: rng.choice(spec)
+    if isinstance(spec, dict) and len(spec) == 1:
+        kind, value = next(iter(spec.items()))
+        if kind == "randint":
+            return lambda rng: rng.randint(*value)
+        if kind == "uniform":
+            return lambda rng: rng.uniform(*value)
+        if kind == "call":
+            module_name, _, function_name = value.partition(":")
+            return getattr(importlib.import_module(module_name), function_name)
+    return lambda rng: spec
+
+
+class Endpoint:
+    def __init__(self, spec: dict) -> None:
+        self.name: str = spec["name"]
+        self.weight: float = spec.get("weight", 1)
+        self.max_pages: Optional[int] = spec.get("max_pages")
+        self.max_items: Optional[int] = spec.get("max_items")
+        self.arguments = {
+            name: _argument_generator(value)
+            for name, value in spec.get("args", {}).items()
+        }
+
+    def call(self, api: Api, rng: random.Random) -> int:
+        """
+        Call the endpoint, iterating any pages, and return the number of items seen.
+        """
+        result = getattr(api, self.name)(
+            **{name: generate(rng) for name, generate in self.arguments.items()}
+        )
+        if not hasattr(result, "__next__"):
+            return 1
+        items = 0
+        with api.page_limit(self.max_pages):
+            for _ in result:
+                items += 1
+                if self.max_items is not None and items >= self.max_items:
+                    break
+        result.close()
+        return items
+
+
+class Workload:
+    def __init__(self, spec: dict) -> None:
+        if not spec.get("endpoints"):
+            raise ValueError("Workload has no endpoints")
+        self.endpoints = [Endpoint(endpoint) for endpoint in spec["endpoints"]]
+        self.concurrency: int = spec.get("concurrency", 1)
+        self.duration: float = spec.get("duration", 10)
+        self.base_url: Optional[str] = spec.get("base_url")
+
+    @classmethod
+    def load(cls, path: str) -> "Workload":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def choose(self, rng: random.Random) -> Endpoint:
+        return rng.choices(self.endpoints, [e.weight for e in self.endpoints])[0]
+
+
+class EndpointResult:
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.items = 0
+        self.errors = 0
+        # the number of errors of each exception type
+        self.error_types: Dict[str, int] = {}
+
+    def percentile(self, percentile: float) -> float:
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        return latencies[
+            min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+        ]
+
+
+class BenchResult:
+    def __init__(self, api: Api, elapsed: float) -> None:
+        self.api = api
+        self.elapsed = elapsed
+        self.endpoints: Dict[str, EndpointResult] = {}
+        self.profile: Optional[pstats.Stats] = None
+
+    def connection_counts(self) -> Optional[Dict[str, int]]:
+        """
+        Connections opened and requests made by the session's urllib3 pools, if it has any.
+        """
+        counts = {"connections": 0, "requests": 0}
+        pools_found = False
+        for adapter in set(self.api.session.adapters.values()):
+            if not isinstance(adapter, requests.adapters.HTTPAdapter):
+                continue
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                pools_found = True
+                counts["connections"] += pool.num_connections
+                counts["requests"] += pool.num_requests
+        return counts if pools_found else None
+
+    def report(self) -> str:
+        metrics = self.api.metrics
+        lines = [
+            f"{'endpoint':<24}{'calls':>8}{'errors':>8}{'calls/s':>10}{'items/s':>10}"
+            f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'network':>9}{'decode':>8}{'slink':>8}"
+        ]
+        for name, result in sorted(self.endpoints.items()):
+            total = sum(result.latencies)
+            network = metrics[f"{name}.network_seconds"]
+            decode = metrics[f"{name}.decode_seconds"]
+            overhead = max(0.0, total - network - decode)
+
+            def share(seconds: float) -> str:
+                return f"{100 * seconds / total:.0f}%" if total else "-"
+
+            lines.append(
+                f"{name:<24}{len(result.latencies):>8}{result.errors:>8}"
+                f"{len(result.latencies) / self.elapsed:>10.1f}{result.items / self.elapsed:>10.1f}"
+                f"{1000 * result.percentile(50):>9.1f}{1000 * result.percentile(90):>9.1f}"
+                f"{1000 * result.percentile(99):>9.1f}{share(network):>9}{share(decode):>8}{share(overhead):>8}"
+            )
+        for name, result in sorted(self.endpoints.items()):
+            if result.error_types:
+                errors = ", ".join(
+                    f"{count} {error}"
+                    for error, count in sorted(result.error_types.items())
+                )
+                lines.append(f"{name} errors: {errors}")
+        counts = self.connection_counts()
+        if counts is not None and counts["requests"]:
+            reuse = 1 - counts["connections"] / counts["requests"]
+            lines.append(
+                f"connections: {counts['connections']} opened for {counts['requests']} requests ({100 * reuse:.0f}% reused)"
+            )
+        return "\n".join(lines)
+
+
+def run_workload(
+    api: Api,
+    workload: Workload,
+    concurrency: Optional[int] = None,
+    duration: Optional[float] = None,
+    profile: bool = False,
+    seed: Optional[int] = None,
+) -> BenchResult:
+    concurrency = concurrency if concurrency is not None else workload.concurrency
+    duration = duration if duration is not None else workload.duration
+    seeds = random.Random(seed)
+    lock = threading.Lock()
+    results: Dict[str, EndpointResult] = {
+        e.name: EndpointResult() for e in workload.endpoints
+    }
+    profiles: List[cProfile.Profile] = []
+    deadline = time.perf_counter() + duration
+    # from 3.12 cProfile is built on sys.monitoring, which sees every thread but allows only one active profiler
+    shared_profiler = profile and sys.version_info >= (3, 12)
+
+    def worker(rng: random.Random) -> None:
+        profiler = cProfile.Profile() if profile and not shared_profiler else None
+        if profiler is not None:
+            profiler.enable()
+        try:
+            while time.perf_counter() < deadline:
+                endpoint = workload.choose(rng)
+                start = time.perf_counter()
+                error = None
+                try:
+                    items = endpoint.call(api, rng)
+                except Exception as e:
+                    items = 0
+                    error = type(e).__name__
+                latency = time.perf_counter() - start
+                with lock:
+                    result = results[endpoint.name]
+                    result.latencies.append(latency)
+                    result.items += items
+                    if error is not None:
+                        result.errors += 1
+                        result.error_types[error] = result.error_types.get(error, 0) + 1
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                with lock:
+                    profiles.append(profiler)
+
+    if shared_profiler:
+        profiles.append(cProfile.Profile())
+        profiles[0].enable()
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(random.Random(seeds.random()),),
+            name=f"slink-bench-{i}",
+        )
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if shared_profiler:
+        profiles[0].disable()
+
+    bench_result = BenchResult(api, time.perf_counter() - start)
+    bench_result.endpoints = {k: v for k, v in results.items() if v.latencies}
+    if profiles:
+        bench_result.profile = pstats.Stats(profiles[0])
+        for profiler in itertools.islice(profiles, 1, None):
+            bench_result.profile.add(profiler)
+    return bench_result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m slink.bench", description=__doc__.split("\n\n")[0].strip()
+    )
+    parser.add_argument("api", help="the Api subclass to drive, as module:class")
+    parser.add_argument("workload", help="path to the workload JSON")
+    parser.add_argument("--base-url", help="target to drive, overriding the workload")
+    parser.add_argument("--concurrency", type=int, help="number of worker threads")
+    parser.add_argument("--duration", type=float, help="seconds to run for")
+    parser.add_argument("--replay", help="serve requests from this recorded cassette")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds of latency for --replay"
+    )
+    parser.add_argument("--seed", type=int, help="seed for repeatable runs")
+    parser.add_argument(
+        "--profile", help="write merged cProfile stats of the workers here"
+    )
+    args = parser.parse_args(argv)
+
+    workload = Workload.load(args.workload)
+    base_url = args.base_url or workload.base_url
+    if base_url is None:
+        parser.error("no base url given in the workload or with --base-url")
+    api = load_api_class(args.api)(base_url=base_url)
+    if args.replay:
+        api.replay(args.replay, latency=args.latency, seed=args.seed)
+
+    result = run_workload(
+        api,
+        workload,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        profile=args.profile is not None,
+        seed=args.seed,
+    )
+    print(result.report())
+    if result.profile is not None:
+        result.profile.dump_stats(args.profile)
+        result.profile.sort_stats("cumulative").print_stats(20)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,66 @@
 import copy
 import functools
+import json
 import logging
-from typing import Optional
-from .api import Api, DecoratorParser, Pager
+import time
+from typing import Any, Optional, Tuple
+import requests
+from .api import AdaptivePageSize, Api, DecoratorParser, Pager, ResourceVersion
+from .diff import apply_update, json_patch, merge_patch
+from .hedging import Hedge
 
 logger = logging.getLogger("slink")
 
 
+_PATCH_CONTENT_TYPES = {
+    "merge": "application/merge-patch+json",
+    "json-patch": "application/json-patch+json",
+}
+
+
+def _make_patch(
+    diff: str,
+    version: Optional[ResourceVersion],
+    document: Any,
+    remove_missing: bool,
+) -> Tuple[Any, dict]:
+    headers = {"Content-Type": _PATCH_CONTENT_TYPES[diff]}
+    if version is None:
+        # nothing to diff against, so patch the whole document
+        if diff == "merge":
+            return merge_patch({}, document), headers
+        return [{"op": "replace", "path": "", "value": document}], headers
+    if version.etag is not None:
+        headers["If-Match"] = version.etag
+    if diff == "merge":
+        return merge_patch(version.document, document, remove_missing), headers
+    return json_patch(version.document, document, remove_missing), headers
+
+
+def _unchanged_response(url: str, version: ResourceVersion) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 304
+    response.reason = "Not Modified"
+    response.url = url
+    response._content = json.dumps(version.document).encode("utf-8")
+    if version.etag is not None:
+        response.headers["ETag"] = version.etag
+    return response
+
+
 def _wrap_response_func(
-    method: str, url_template: str, decoratorParser: DecoratorParser
+    method: str,
+    url_template: str,
+    decoratorParser: DecoratorParser,
+    hedge: Optional[Hedge] = None,
+    lane: Optional[str] = None,
+    track: bool = False,
+    diff: Optional[str] = None,
+    remove_missing: bool = False,
 ):
     def wrap(process_response):
+        name = process_response.__name__
+
         @functools.wraps(process_response)
         def make_request(self: Api, *args, **kwargs):
             params, body = decoratorParser.parse(args, kwargs)
@@ -19,12 +69,75 @@ def _wrap_response_func(
             logger.debug(
                 f"{method} {url} params={params} body={'yes' if json else 'no'}"
             )
-            self._response = self.session.request(
-                method=method, url=url, params=params, json=json
-            )
+
+            # resolve the lane here, hedged requests are sent from other threads
+            request_lane = self.current_lane(lane)
+            document = json
+            version = self.tracked_version(url) if diff is not None else None
+            headers = None
+            unchanged = False
+            if diff is not None:
+                json, headers = _make_patch(diff, version, document, remove_missing)
+                unchanged = version is not None and (
+                    json == [] if diff == "json-patch" else json == {}
+                )
+
+            def send() -> requests.Response:
+                return self._send(
+                    method,
+                    url,
+                    request_lane,
+                    params=params,
+                    json=json,
+                    headers=headers,
+                )
+
+            if unchanged:
+                assert version is not None
+                logger.debug(f"{method} {url} skipped, resource is unchanged")
+                self._response = _unchanged_response(url, version)
+                self.metrics.increment(f"{name}.skipped")
+            else:
+                start = time.perf_counter()
+                if hedge is not None:
+                    self._response = hedge.send(self, name, send)
+                else:
+                    self._response = send()
+                self.metrics.increment(f"{name}.requests")
+                self.metrics.increment(
+                    f"{name}.network_seconds", time.perf_counter() - start
+                )
+
+            response = self._response
+            if diff is not None and response.status_code == 412:
+                self.forget_versions(url)
+            elif diff is not None and response.ok:
+                # copied, so the caller changing and re-sending the same dict is still diffed against what was sent
+                etag = response.headers.get("ETag")
+                updated = (
+                    apply_update(version.document, document, remove_missing)
+                    if version is not None
+                    else document
+                )
+                self.track_version(url, ResourceVersion(copy.deepcopy(updated), etag))
+            elif track and response.ok:
+                try:
+                    fetched = response.json()
+                except ValueError:
+                    logger.debug(f"{method} {url} not tracked, body isn't JSON")
+                    self.forget_versions(url)
+                else:
+                    etag = response.headers.get("ETag")
+                    self.track_version(url, ResourceVersion(fetched, etag))
             self.check_response()
+            self._projection = decoratorParser.projection
+            start = time.perf_counter()
             result = process_response(self, **kwargs)
+            self.metrics.increment(
+                f"{name}.decode_seconds", time.perf_counter() - start
+            )
             self._response = None
+            self._projection = None
             return result
 
         return make_request
@@ -32,7 +145,13 @@ def _wrap_response_func(
     return wrap
 
 
-def get(url_template, **kwargs):
+def get(
+    url_template,
+    hedge: Optional[Hedge] = None,
+    lane: Optional[str] = None,
+    track: bool = False,
+    **kwargs,
+):
     decoratorParser = DecoratorParser(kwargs)
     if len(decoratorParser.bodyParams) > 0:
         raise Exception(
@@ -40,11 +159,37 @@ def get(url_template, **kwargs):
         )
 
     return _wrap_response_func(
-        "GET", url_template=url_template, decoratorParser=decoratorParser
+        "GET",
+        url_template=url_template,
+        decoratorParser=decoratorParser,
+        hedge=hedge,
+        lane=lane,
+        track=track,
     )
 
 
-def post(url_template: str, **kwargs):
+def head(
+    url_template,
+    hedge: Optional[Hedge] = None,
+    lane: Optional[str] = None,
+    **kwargs,
+):
+    decoratorParser = DecoratorParser(kwargs)
+    if len(decoratorParser.bodyParams) > 0:
+        raise Exception(
+            f"Cannot pass Body() argument to @head (got {', '.join(decoratorParser.bodyParams)})"
+        )
+
+    return _wrap_response_func(
+        "HEAD",
+        url_template=url_template,
+        decoratorParser=decoratorParser,
+        hedge=hedge,
+        lane=lane,
+    )
+
+
+def post(url_template: str, lane: Optional[str] = None, **kwargs):
     decoratorParser = DecoratorParser(kwargs)
     if len(decoratorParser.bodyParams) > 1:
         raise Exception(
@@ -52,11 +197,14 @@ def post(url_template: str, **kwargs):
         )
 
     return _wrap_response_func(
-        "POST", url_template=url_template, decoratorParser=decoratorParser
+        "POST",
+        url_template=url_template,
+        decoratorParser=decoratorParser,
+        lane=lane,
     )
 
 
-def delete(url_template: str, **kwargs):
+def delete(url_template: str, lane: Optional[str] = None, **kwargs):
     decoratorParser = DecoratorParser(kwargs)
     if len(decoratorParser.bodyParams) > 0:
         raise Exception(
@@ -64,11 +212,14 @@ def delete(url_template: str, **kwargs):
         )
 
     return _wrap_response_func(
-        "DELETE", url_template=url_template, decoratorParser=decoratorParser
+        "DELETE",
+        url_template=url_template,
+        decoratorParser=decoratorParser,
+        lane=lane,
     )
 
 
-def put(url_template: str, **kwargs):
+def put(url_template: str, lane: Optional[str] = None, **kwargs):
     decoratorParser = DecoratorParser(kwargs)
     if len(decoratorParser.bodyParams) > 1:
         raise Exception(
@@ -76,11 +227,95 @@ def put(url_template: str, **kwargs):
         )
 
     return _wrap_response_func(
-        "PUT", url_template=url_template, decoratorParser=decoratorParser
+        "PUT",
+        url_template=url_template,
+        decoratorParser=decoratorParser,
+        lane=lane,
     )
 
 
-def get_pages(url_template, pager: Optional[Pager] = None, **kwargs):
+def patch(
+    url_template: str,
+    lane: Optional[str] = None,
+    diff: Optional[str] = None,
+    remove_missing: bool = False,
+    **kwargs,
+):
+    decoratorParser = DecoratorParser(kwargs)
+    if len(decoratorParser.bodyParams) > 1:
+        raise Exception(
+            f"Can only have one Body() argument to @patch (got {', '.join(decoratorParser.bodyParams)})"
+        )
+    if diff is not None and diff not in _PATCH_CONTENT_TYPES:
+        raise Exception(
+            f"Unknown diff '{diff}' for @patch (expected {' or '.join(_PATCH_CONTENT_TYPES)})"
+        )
+    if diff is not None and len(decoratorParser.bodyParams) == 0:
+        raise Exception("Must supply a Body() argument to @patch with diff")
+
+    return _wrap_response_func(
+        "PATCH",
+        url_template=url_template,
+        decoratorParser=decoratorParser,
+        lane=lane,
+        diff=diff,
+        remove_missing=remove_missing,
+    )
+
+
+def _get_sized_page(
+    api: Api,
+    name: str,
+    url: str,
+    params: Optional[dict],
+    page_size: AdaptivePageSize,
+    lane: Optional[str],
+    bounded: bool,
+) -> Tuple[requests.Response, float]:
+    # pages requested as is don't carry the page size, so shrinking it wouldn't change the retry
+    sized = params is not None
+    retries = 0
+    while True:
+        sized_params = page_size.apply(params) if sized else None
+        start = time.perf_counter()
+        try:
+            response = api._send(
+                "GET", url, lane, buffered=bounded, params=sized_params
+            )
+        except requests.Timeout:
+            if not sized or retries >= page_size.max_retries or not page_size.backoff():
+                raise
+            logger.debug(f"GET {url} timed out, backing off to {page_size.size}")
+        else:
+            seconds = time.perf_counter() - start
+            if (
+                not sized
+                or response.status_code < 500
+                or retries >= page_size.max_retries
+                or not page_size.backoff()
+            ):
+                api.metrics.set(f"{name}.page_size", page_size.size)
+                return response, seconds
+            if bounded:
+                api._release_response(response)
+            else:
+                response.close()
+            logger.debug(
+                f"GET {url} failed with {response.status_code}, backing off to {page_size.size}"
+            )
+        api.metrics.increment(f"{name}.page_size_backoffs")
+        # give a struggling upstream time to recover, outside any scheduler slot
+        time.sleep(page_size.retry_delay * 2**retries)
+        retries += 1
+
+
+def get_pages(
+    url_template,
+    pager: Optional[Pager] = None,
+    lane: Optional[str] = None,
+    bounded: bool = False,
+    **kwargs,
+):
     if pager is None:
         raise ValueError("Must supply pager argument to get_pages")
 
@@ -98,27 +333,94 @@ def get_pages(url_template, pager: Optional[Pager] = None, **kwargs):
             params, body = decoratorParser.parse(args, kwargs)
             url = self.construct_url(url_template, kwargs)
             page_generator = pager_actual.pages(url)
+            page_size: Optional[AdaptivePageSize] = getattr(
+                pager_actual, "page_size", None
+            )
+            name = get_impl.__name__
+            page_limit = self.current_page_limit()
+            pages = 0
             response = None
+            # (items, seconds, bytes) of the last page, only recorded once the pager has advanced past it
+            last_page = None
+            # in bounded mode, the page whose body is still buffered
+            held: Optional[requests.Response] = None
             try:
                 while True:
+                    if page_limit is not None and pages >= page_limit:
+                        break
                     page_params = None
                     if response is not None:
-                        url, page_params = page_generator.send(response)
+                        try:
+                            url, page_params = page_generator.send(response)
+                        finally:
+                            if held is not None:
+                                self._release_response(held)
+                                held = None
                     elif next_result := next(page_generator):
                         assert next_result
                         url, page_params = next_result
                     if page_params is not None:
                         page_params = {**params, **page_params}
-                    response = self.session.get(url, params=page_params)
-                    assert response
+                    if page_size is not None:
+                        if last_page is not None:
+                            page_size.record(*last_page)
+                            self.metrics.set(
+                                f"{name}.items_per_second", page_size.throughput
+                            )
+                        response, seconds = _get_sized_page(
+                            self,
+                            name,
+                            url,
+                            page_params,
+                            page_size,
+                            self.current_lane(lane),
+                            bounded,
+                        )
+                    else:
+                        start = time.perf_counter()
+                        response = self._send(
+                            "GET",
+                            url,
+                            self.current_lane(lane),
+                            buffered=bounded,
+                            params=page_params,
+                        )
+                        seconds = time.perf_counter() - start
+                    pages += 1
+                    self.metrics.increment(f"{name}.requests")
+                    self.metrics.increment(f"{name}.network_seconds", seconds)
+                    assert response is not None
+                    if bounded:
+                        held = response
                     self._response = response
                     self.check_response()
-                    for value in get_impl(self, *args, **kwargs):
-                        yield value
+                    self._projection = decoratorParser.projection
+                    items = 0
+                    # time spent producing values, not the caller consuming them, added up over the page
+                    decode_seconds = 0.0
+                    values = get_impl(self, *args, **kwargs)
+                    try:
+                        while True:
+                            start = time.perf_counter()
+                            try:
+                                value = next(values)
+                            except StopIteration:
+                                break
+                            finally:
+                                decode_seconds += time.perf_counter() - start
+                            items += 1
+                            yield value
+                    finally:
+                        self.metrics.increment(f"{name}.decode_seconds", decode_seconds)
+                    if page_size is not None:
+                        last_page = (items, seconds, len(response.content))
             except StopIteration:
                 pass
             finally:
+                if held is not None:
+                    self._release_response(held)
                 self._response = None
+                self._projection = None
 
         return call_get
 
@@ -0,0 +1,78 @@
+from typing import Any, List
+
+
+def merge_patch(
+    source: Any, target: Any, remove_missing: bool = False, path: str = ""
+) -> Any:
+    """
+    An RFC 7386 JSON Merge Patch turning `source` into `target`. Members missing from `target` are left unchanged, or
+    removed with `remove_missing`. Lists are replaced whole, and since null removes a member, changing a member to
+    None raises a ValueError.
+    """
+    if not isinstance(source, dict) or not isinstance(target, dict):
+        return target
+    patch = {}
+    if remove_missing:
+        patch = {key: None for key in source if key not in target}
+    for key, value in target.items():
+        if key in source and source[key] == value:
+            continue
+        if value is None:
+            raise ValueError(
+                f"Can't set '{path}/{_escape(key)}' to null with a JSON Merge Patch, use diff=\"json-patch\""
+            )
+        if key not in source:
+            patch[key] = merge_patch({}, value, path=f"{path}/{_escape(key)}")
+        else:
+            member = merge_patch(
+                source[key], value, remove_missing, f"{path}/{_escape(key)}"
+            )
+            # a member that only differs by keys left out of `target` is unchanged
+            if member != {} or not isinstance(source[key], dict):
+                patch[key] = member
+    return patch
+
+
+def _escape(key: str) -> str:
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def json_patch(
+    source: Any, target: Any, remove_missing: bool = False, path: str = ""
+) -> List[dict]:
+    """
+    RFC 6902 JSON Patch operations turning `source` into `target`, an empty list if they are equal. Members missing
+    from `target` are left unchanged, or removed with `remove_missing`. Lists are replaced whole.
+    """
+    if not isinstance(source, dict) or not isinstance(target, dict):
+        if source == target:
+            return []
+        return [{"op": "replace", "path": path, "value": target}]
+    operations = []
+    if remove_missing:
+        operations = [
+            {"op": "remove", "path": f"{path}/{_escape(key)}"}
+            for key in source
+            if key not in target
+        ]
+    for key, value in target.items():
+        member_path = f"{path}/{_escape(key)}"
+        if key not in source:
+            operations.append({"op": "add", "path": member_path, "value": value})
+        else:
+            operations.extend(
+                json_patch(source[key], value, remove_missing, member_path)
+            )
+    return operations
+
+
+def apply_update(source: Any, target: Any, remove_missing: bool = False) -> Any:
+    """
+    The document that patching `source` with the difference to `target` leaves behind.
+    """
+    if remove_missing or not isinstance(source, dict) or not isinstance(target, dict):
+        return target
+    updated = dict(source)
+    for key, value in target.items():
+        updated[key] = apply_update(source[key], value) if key in source else value
+    return updated
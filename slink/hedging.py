@@ -0,0 +1,175 @@
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent import futures
+from typing import Callable, Deque, Dict, List, Optional
+import requests
+from .api import Api
+
+logger = logging.getLogger("slink")
+
+
+def _failed(future: "futures.Future[requests.Response]") -> bool:
+    return future.exception() is not None or future.result().status_code >= 500
+
+
+def _start_thread(
+    send: Callable[[], requests.Response],
+) -> "futures.Future[requests.Response]":
+    future: "futures.Future[requests.Response]" = futures.Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(send())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="slink-request", daemon=True).start()
+    return future
+
+
+def _close_response(future: "futures.Future[requests.Response]") -> None:
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class Hedge:
+    """
+    Opt-in hedging policy for idempotent endpoints, eg `@get("rest/api/3/{key}", hedge=Hedge(delay=0.05))`.
+
+    If no response has arrived after `delay` seconds (or, once `min_samples` latencies have been seen, the
+    `percentile` of the endpoint's last `window` latencies), a duplicate request is sent and whichever response
+    arrives first is used, unless it is an error and the other might still succeed. The other is cancelled if it
+    hasn't started, or closed when it finishes. Hedges are only sent while they stay under `budget`, the fraction of
+    the last `window` requests that may be duplicated, and at most `max_workers` hedges are in flight at once.
+    """
+
+    def __init__(
+        self,
+        delay: float = 0.1,
+        percentile: Optional[float] = None,
+        budget: float = 0.1,
+        window: int = 100,
+        min_samples: int = 10,
+        max_workers: int = 8,
+    ) -> None:
+        if percentile is not None and not 0 < percentile < 100:
+            raise ValueError(
+                f"Hedge percentile must be between 0 and 100 (got {percentile})"
+            )
+        if not 0 <= budget <= 1:
+            raise ValueError(f"Hedge budget must be between 0 and 1 (got {budget})")
+        self.delay = delay
+        self.percentile = percentile
+        self.budget = budget
+        self.window = window
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+        # whether each of the last `window` requests was hedged, for the budget; each is a one-item list its request
+        # can update
+        self._recent: Deque[List[bool]] = deque(maxlen=window)
+        self._executor: Optional[futures.ThreadPoolExecutor] = None
+        _hedges.add(self)
+
+    def _after_fork(self) -> None:
+        # the executor's threads don't exist in a forked child
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def hedge_delay(self, name: str) -> float:
+        with self._lock:
+            latencies = sorted(self._latencies.get(name, ()))
+        if self.percentile is None or len(latencies) < self.min_samples:
+            return self.delay
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+        return latencies[index]
+
+    def _observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            latencies = self._latencies.setdefault(name, deque(maxlen=self.window))
+            latencies.append(seconds)
+
+    def _reserve_hedge(self, hedged: List[bool]) -> bool:
+        # a rolling window, so budget left over from a quiet period can't be spent all at once
+        with self._lock:
+            hedges = sum(entry[0] for entry in self._recent)
+            if hedges + 1 > self.budget * len(self._recent):
+                return False
+            hedged[0] = True
+            return True
+
+    def _get_executor(self) -> futures.ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="slink-hedge"
+                )
+            return self._executor
+
+    def send(
+        self, api: Api, name: str, send: Callable[[], requests.Response]
+    ) -> requests.Response:
+        hedged_flag = [False]
+        with self._lock:
+            self._recent.append(hedged_flag)
+        start = time.perf_counter()
+        # the primary gets its own thread rather than waiting for a pool worker, so hedging doesn't cap the requests
+        # in flight or add queueing to the observed latency, and the caller can still return as soon as a hedge wins
+        primary = _start_thread(send)
+        try:
+            response = primary.result(timeout=self.hedge_delay(name))
+        except futures.TimeoutError:
+            pass
+        else:
+            self._observe(name, time.perf_counter() - start)
+            return response
+
+        if not self._reserve_hedge(hedged_flag):
+            response = primary.result()
+            self._observe(name, time.perf_counter() - start)
+            return response
+
+        api.metrics.increment(f"{name}.hedges_sent")
+        hedged = self._get_executor().submit(send)
+        pending = {primary, hedged}
+        failed: List["futures.Future[requests.Response]"] = []
+        for winner in futures.as_completed(pending):
+            pending.discard(winner)
+            if _failed(winner) and pending:
+                failed.append(winner)
+                continue
+            if _failed(winner):
+                # neither succeeded, so report the first failure
+                failed.append(winner)
+                winner = failed[0]
+            for loser in [*pending, *failed]:
+                if loser is not winner:
+                    loser.cancel()
+                    loser.add_done_callback(_close_response)
+            if winner is hedged:
+                api.metrics.increment(f"{name}.hedges_won")
+            self._observe(name, time.perf_counter() - start)
+            return winner.result()
+        raise AssertionError("unreachable")
+
+
+_hedges: "weakref.WeakSet[Hedge]" = weakref.WeakSet()
+
+
+def _reset_hedges_after_fork() -> None:
+    for hedge in list(_hedges):
+        try:
+            hedge._after_fork()
+        except Exception:
+            logger.exception(f"Failed to reset {hedge!r} after fork")
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_hedges_after_fork)
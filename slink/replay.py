@@ -0,0 +1,230 @@
+import base64
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import IO, Callable, Dict, List, Optional, Union, cast
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+import requests.adapters
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# headers describing the wire encoding, which no longer apply once the body has been decoded
+_WIRE_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+def _open(path: str, mode: str) -> IO:
+    if path.endswith(".gz"):
+        return cast(IO, gzip.open(path, mode + "t", encoding="utf-8"))
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    """
+    Recorded responses, keyed by method, url (with the query sorted) and a hash of the request body. A request made
+    several times keeps every response, and replay cycles through them in order.
+    """
+
+    def __init__(self, interactions: Optional[Dict[str, List[dict]]] = None) -> None:
+        self.interactions = interactions if interactions is not None else {}
+        self._lock = threading.Lock()
+        self._replayed: Dict[str, int] = {}
+
+    @staticmethod
+    def key(request: requests.PreparedRequest) -> str:
+        scheme, netloc, path, query, _ = urlsplit(request.url or "")
+        url = urlunsplit(
+            (scheme, netloc, path, urlencode(sorted(parse_qsl(query))), "")
+        )
+        key = f"{request.method} {url}"
+        body = request.body
+        if body:
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            key += f" {hashlib.sha256(body).hexdigest()[:16]}"
+        return key
+
+    def record(
+        self, request: requests.PreparedRequest, response: requests.Response
+    ) -> None:
+        interaction: dict = {
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                k: v
+                for k, v in response.headers.items()
+                if k.lower() not in _WIRE_HEADERS
+            },
+            "elapsed": response.elapsed.total_seconds(),
+        }
+        try:
+            interaction["body"] = response.content.decode("utf-8")
+        except UnicodeDecodeError:
+            interaction["body_base64"] = base64.b64encode(response.content).decode()
+        with self._lock:
+            self.interactions.setdefault(self.key(request), []).append(interaction)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return bool(self.interactions.get(key))
+
+    def next_interaction(self, key: str) -> Optional[dict]:
+        with self._lock:
+            recorded = self.interactions.get(key)
+            if not recorded:
+                return None
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+            return recorded[index % len(recorded)]
+
+    def save(self, path: str) -> None:
+        with self._lock, _open(path, "w") as f:
+            json.dump(
+                {"version": 1, "interactions": self.interactions},
+                f,
+                separators=(",", ":"),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with _open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != 1:
+            raise Exception(f"Unsupported cassette version in '{path}'")
+        return cls(data["interactions"])
+
+
+class RecordingAdapter(requests.adapters.BaseAdapter):
+    """
+    Sends requests through `adapter` as usual, recording every response in `cassette`.
+    """
+
+    def __init__(
+        self, cassette: Cassette, adapter: requests.adapters.BaseAdapter
+    ) -> None:
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ) -> requests.Response:
+        response = self.adapter.send(
+            request,
+            stream=stream,
+            timeout=timeout,
+            verify=verify,
+            cert=cert,
+            proxies=proxies,
+        )
+        self.cassette.record(request, response)
+        return response
+
+    def close(self) -> None:
+        self.adapter.close()
+
+
+LatencyType = Union[float, str, Callable[[random.Random], float]]
+
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """
+    A local stand-in for an upstream, serving responses from a cassette.
+
+    Each response is delayed by `latency`: a number of seconds, "recorded" for the latency seen when recording, or a
+    function of a random.Random, eg `lambda rng: rng.lognormvariate(-3, 0.5)`. Its body is then delayed further to
+    fit within `bandwidth` bytes per second, and `error_rate` of responses are replaced with `error_status`. At most
+    `pool_maxsize` requests are served at once, like a connection pool, and read timeouts are honoured. Pass `seed`
+    for repeatable runs.
+
+    Responses never touch a socket, so connection setup and reuse aren't simulated: only the latency given here is.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        latency: LatencyType = 0.0,
+        bandwidth: Optional[float] = None,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        pool_maxsize: int = requests.adapters.DEFAULT_POOLSIZE,
+        seed: Optional[int] = None,
+    ) -> None:
+        if isinstance(latency, str) and latency != "recorded":
+            raise ValueError(
+                f"Replay latency must be a number, a function or 'recorded' (got '{latency}')"
+            )
+        super().__init__()
+        self.cassette = cassette
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._connections = threading.BoundedSemaphore(pool_maxsize)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _latency(self, interaction: dict) -> float:
+        if isinstance(self.latency, str):
+            return interaction.get("elapsed", 0.0)
+        if callable(self.latency):
+            with self._random_lock:
+                return self.latency(self._random)
+        return float(self.latency)
+
+    def _is_error(self) -> bool:
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    def _build_response(
+        self, request: requests.PreparedRequest, interaction: dict
+    ) -> requests.Response:
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.reason = interaction.get("reason", "")
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        if "body_base64" in interaction:
+            response._content = base64.b64decode(interaction["body_base64"])
+        else:
+            response._content = interaction.get("body", "").encode("utf-8")
+        response._content_consumed = True  # type: ignore
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url or ""
+        response.request = request
+        return response
+
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ) -> requests.Response:
+        key = Cassette.key(request)
+        if key not in self.cassette:
+            raise requests.ConnectionError(
+                f"No recorded response for '{key}'", request=request
+            )
+        # an injected error stands in for a failed attempt, so the retry still gets the next recorded response
+        interaction: Optional[dict]
+        if self._is_error():
+            interaction = {"status": self.error_status, "headers": {}, "body": ""}
+        else:
+            interaction = self.cassette.next_interaction(key)
+        assert interaction is not None
+
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        with self._connections:
+            response = self._build_response(request, interaction)
+            delay = self._latency(interaction)
+            if self.bandwidth:
+                delay += len(response.content) / self.bandwidth
+            if read_timeout is not None and delay > read_timeout:
+                time.sleep(read_timeout)
+                raise requests.ReadTimeout(
+                    f"Replayed response for '{key}' timed out", request=request
+                )
+            time.sleep(delay)
+        return response
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,148 @@
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Deque, Dict, Iterator, Optional
+
+if TYPE_CHECKING:
+    from .api import Metrics
+
+
+class Lane:
+    """
+    A class of traffic for a Scheduler. While lanes compete for connections each gets a share in proportion to its
+    `weight`, and lanes with a higher `priority` go first when their shares are equal. At most `limit` of a lane's
+    requests run at once, and `reserved` connections are kept free for the lane even when other lanes are queueing.
+    """
+
+    def __init__(
+        self,
+        priority: int = 0,
+        limit: Optional[int] = None,
+        reserved: int = 0,
+        weight: float = 1,
+    ) -> None:
+        if weight <= 0:
+            raise ValueError(f"Lane weight must be positive (got {weight})")
+        self.priority = priority
+        self.limit = limit
+        self.reserved = reserved
+        self.weight = weight
+
+
+class _LaneState:
+    def __init__(self, lane: Lane) -> None:
+        self.lane = lane
+        self.active = 0
+        self.waiting: Deque[int] = deque()
+        # the lane's virtual finish time, which advances by 1 / weight for each request it starts
+        self.finish = 0.0
+
+    @property
+    def unused_reservation(self) -> int:
+        return max(0, self.lane.reserved - self.active)
+
+
+class Scheduler:
+    """
+    Shares `capacity` connections between lanes of traffic, eg
+
+        Scheduler(capacity=10, lanes={"interactive": Lane(weight=4, reserved=2), "batch": Lane(limit=6)})
+
+    Requests queue first-in first-out within a lane. Connections are shared between lanes by weighted fair queueing,
+    so a busy lane can't starve the others: a free connection goes to the lane that has had the least of its share,
+    then to the highest priority lane, then to the request that has been waiting longest.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10,
+        lanes: Optional[Dict[str, Lane]] = None,
+        default_lane: str = "default",
+    ) -> None:
+        lanes = lanes if lanes is not None else {default_lane: Lane()}
+        if default_lane not in lanes:
+            raise ValueError(f"Default lane '{default_lane}' is not one of the lanes")
+        reserved = sum(lane.reserved for lane in lanes.values())
+        if reserved > capacity:
+            raise ValueError(
+                f"Lanes reserve more connections than the scheduler capacity of {capacity}"
+            )
+        if reserved == capacity and any(lane.reserved == 0 for lane in lanes.values()):
+            # an unreserved lane could never get a connection
+            raise ValueError(
+                f"Lanes reserve the whole scheduler capacity of {capacity}, leaving none for lanes without a reservation"
+            )
+        self.capacity = capacity
+        self.lanes = lanes
+        self.default_lane = default_lane
+        self._reset()
+
+    def _reset(self) -> None:
+        self._condition = threading.Condition()
+        self._states = {name: _LaneState(lane) for name, lane in self.lanes.items()}
+        self._active = 0
+        self._tickets = itertools.count()
+        self._virtual_time = 0.0
+
+    def _eligible(self, name: str) -> bool:
+        state = self._states[name]
+        if not state.waiting:
+            return False
+        if state.lane.limit is not None and state.active >= state.lane.limit:
+            return False
+        reserved_for_others = sum(
+            other.unused_reservation
+            for other_name, other in self._states.items()
+            if other_name != name
+        )
+        return self.capacity - self._active - reserved_for_others > 0
+
+    def _can_start(self, name: str, ticket: int) -> bool:
+        state = self._states[name]
+        if state.waiting[0] != ticket or not self._eligible(name):
+            return False
+        for other_name, other in self._states.items():
+            if other_name == name or not self._eligible(other_name):
+                continue
+            if (other.finish, -other.lane.priority, other.waiting[0]) < (
+                state.finish,
+                -state.lane.priority,
+                ticket,
+            ):
+                return False
+        return True
+
+    @contextmanager
+    def slot(self, lane: Optional[str], metrics: "Metrics") -> Iterator[None]:
+        name = lane if lane is not None else self.default_lane
+        if name not in self._states:
+            raise Exception(f"Unknown lane '{name}'")
+        state = self._states[name]
+        with self._condition:
+            ticket = next(self._tickets)
+            if not state.waiting and not state.active:
+                # an idle lane doesn't bank its unused share
+                state.finish = max(state.finish, self._virtual_time)
+            state.waiting.append(ticket)
+            metrics.set(f"lane.{name}.queue_depth", len(state.waiting))
+            start = time.perf_counter()
+            while not self._can_start(name, ticket):
+                self._condition.wait()
+            state.waiting.popleft()
+            self._virtual_time = state.finish
+            state.finish += 1 / state.lane.weight
+            state.active += 1
+            self._active += 1
+            metrics.set(f"lane.{name}.queue_depth", len(state.waiting))
+            metrics.increment(f"lane.{name}.requests")
+            metrics.increment(f"lane.{name}.wait_seconds", time.perf_counter() - start)
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                state.active -= 1
+                self._active -= 1
+                self._condition.notify_all()
@@ -1,9 +1,10 @@
+import json
 from typing import Generator, Tuple
 from pydantic import BaseModel
 import requests
 import responses
 
-from slink import Api, get, post, Query, Body
+from slink import AdaptivePageSize, Api, get, post, Query, Body
 
 DEFAULT_BASE_URL = "http://example.com"
 
@@ -75,3 +76,41 @@ class LinkedPager:
         response = yield url, {}  # first page is just the raw url
         while next_url := response.json()["links"].get("next"):
             response = yield next_url, {}
+
+
+class AdaptivePager:
+    def __init__(self, page_size: AdaptivePageSize) -> None:
+        self.page_size = page_size
+
+    def pages(self, url: str) -> Generator[Tuple[str, dict], requests.Response, None]:
+        start_at = 0
+        total = None
+        while total is None or start_at < total:
+            response = yield url, {"startAt": start_at}
+            page = response.json()
+            total = page["total"]
+            start_at += len(page["data"])
+
+
+def setup_sized_page_responses(
+    mocked_responses: responses.RequestsMock, base_url, data, failures=0
+):
+    """
+    Serve `data` from startAt/maxCount parameters, failing the first `failures` requests with a 503.
+    """
+    requested_sizes: list[int] = []
+
+    def callback(request):
+        if len(requested_sizes) < failures:
+            requested_sizes.append(int(request.params["maxCount"]))
+            return 503, {}, ""
+        start_at = int(request.params["startAt"])
+        max_count = int(request.params["maxCount"])
+        requested_sizes.append(max_count)
+        page = {"data": data[start_at : start_at + max_count], "total": len(data)}
+        return 200, {}, json.dumps(page)
+
+    mocked_responses.add_callback(
+        responses.GET, f"{base_url}/rest/api/3/pages", callback=callback
+    )
+    return requested_sizes
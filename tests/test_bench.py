@@ -0,0 +1,110 @@
+import json
+import pytest
+
+from slink import Api, get_pages
+from slink.bench import Workload, load_api_class, main, run_workload
+from support import (
+    DEFAULT_BASE_URL,
+    MyTestApi,
+    SimplePager,
+    setup_page_responses,
+)
+
+
+class BenchApi(MyTestApi):
+    @get_pages("rest/api/3/pages", pager=SimplePager())
+    def get_paginated(self):
+        for value in self.response.json()["data"]:
+            yield int(value)
+
+
+@pytest.fixture
+def cassette_path(mocked_responses, tmp_path):
+    setup_page_responses(mocked_responses, DEFAULT_BASE_URL, list(range(1, 20)))
+    mocked_responses.get(
+        f"{DEFAULT_BASE_URL}/rest/api/3/A", json={"name": "a", "value": 1}
+    )
+    mocked_responses.get(
+        f"{DEFAULT_BASE_URL}/rest/api/3/B", json={"name": "b", "value": 2}
+    )
+    path = str(tmp_path / "bench.json")
+    api = BenchApi(base_url=DEFAULT_BASE_URL)
+    with api.record(path):
+        list(api.get_paginated())
+        api.get_resource(resource_key="A")
+        api.get_resource(resource_key="B")
+    mocked_responses.reset()
+    return path
+
+
+WORKLOAD = {
+    "endpoints": [
+        {"name": "get_resource", "weight": 2, "args": {"resource_key": ["A", "B"]}},
+        {"name": "get_paginated", "max_pages": 2},
+    ]
+}
+
+
+def test_it_runs_workloads(cassette_path):
+    api = BenchApi(base_url=DEFAULT_BASE_URL)
+    api.replay(cassette_path, latency=0.001)
+
+    result = run_workload(
+        api, Workload(WORKLOAD), concurrency=2, duration=0.2, profile=True, seed=1
+    )
+
+    assert result.endpoints["get_resource"].errors == 0
+    assert result.endpoints["get_resource"].items > 0
+    paged = result.endpoints["get_paginated"]
+    assert paged.errors == 0
+    # two pages of five items, without fetching a third
+    assert paged.items == 10 * len(paged.latencies)
+    assert api.metrics["get_paginated.requests"] == 2 * len(paged.latencies)
+    assert api.metrics["get_resource.network_seconds"] > 0
+    assert result.profile is not None
+    assert "get_resource" in result.report()
+
+
+def test_it_reports_error_types(cassette_path):
+    api = BenchApi(base_url=DEFAULT_BASE_URL)
+    api.replay(cassette_path)
+    workload = Workload(
+        {"endpoints": [{"name": "get_resource", "args": {"resource_key": "C"}}]}
+    )
+
+    result = run_workload(api, workload, duration=0.05)
+
+    errors = result.endpoints["get_resource"]
+    assert errors.errors == len(errors.latencies)
+    assert errors.error_types == {"ConnectionError": errors.errors}
+    assert f"get_resource errors: {errors.errors} ConnectionError" in result.report()
+
+
+def test_it_runs_from_the_command_line(cassette_path, tmp_path, capsys):
+    workload_path = tmp_path / "workload.json"
+    workload_path.write_text(json.dumps({**WORKLOAD, "base_url": DEFAULT_BASE_URL}))
+
+    main(
+        [
+            "test_bench:BenchApi",
+            str(workload_path),
+            "--replay",
+            cassette_path,
+            "--duration",
+            "0.1",
+            "--concurrency",
+            "2",
+        ]
+    )
+
+    output = capsys.readouterr().out
+    assert "get_paginated" in output
+    assert "get_resource" in output
+
+
+def test_it_only_loads_api_classes():
+    assert load_api_class("support:MyTestApi") is MyTestApi
+    with pytest.raises(ValueError) as e:
+        load_api_class("support:DEFAULT_BASE_URL")
+
+    assert "is not an Api subclass" in str(e)
@@ -0,0 +1,145 @@
+import os
+import ssl
+import time
+import pytest
+import requests.adapters
+import responses
+
+from slink import Hedge, Lane, Scheduler
+from support import DEFAULT_BASE_URL, MyTestApi
+
+
+def run_in_child(check) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os._exit(0 if check() else 1)
+        except BaseException:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+    return os.WEXITSTATUS(status)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_it_rebuilds_connection_pools_after_fork():
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    parent_pool_manager = api.session.get_adapter(DEFAULT_BASE_URL).poolmanager
+
+    def check():
+        adapter = api.session.get_adapter(DEFAULT_BASE_URL)
+        return adapter.poolmanager is not parent_pool_manager
+
+    assert run_in_child(check) == 0
+    assert api.session.get_adapter(DEFAULT_BASE_URL).poolmanager is parent_pool_manager
+
+
+class SSLContextAdapter(requests.adapters.HTTPAdapter):
+    def __init__(self, ssl_context, **kwargs):
+        self.ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+
+class BrokenInChildAdapter(requests.adapters.HTTPAdapter):
+    def __init__(self, **kwargs):
+        self.parent_pid = os.getpid()
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if os.getpid() != self.parent_pid:
+            raise RuntimeError("broken")
+        return super().init_poolmanager(*args, **kwargs)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_it_keeps_adapter_subclass_state_after_fork():
+    ssl_context = ssl.create_default_context()
+    adapter = SSLContextAdapter(ssl_context)
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    api.session.mount("http://", adapter)
+    parent_pool_manager = adapter.poolmanager
+
+    def check():
+        child_adapter = api.session.get_adapter(DEFAULT_BASE_URL)
+        return (
+            child_adapter is adapter
+            and adapter.ssl_context is ssl_context
+            and adapter.poolmanager is not parent_pool_manager
+            and adapter.poolmanager.connection_pool_kw["ssl_context"] is ssl_context
+        )
+
+    assert run_in_child(check) == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_one_failing_api_does_not_stop_the_others_resetting():
+    broken = MyTestApi(base_url=DEFAULT_BASE_URL)
+    broken.session.mount("http://", BrokenInChildAdapter())
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    parent_pool_manager = api.session.get_adapter(DEFAULT_BASE_URL).poolmanager
+
+    def check():
+        adapter = api.session.get_adapter(DEFAULT_BASE_URL)
+        return adapter.poolmanager is not parent_pool_manager
+
+    assert run_in_child(check) == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_it_resets_scheduler_and_hedges_after_fork():
+    scheduler = Scheduler(capacity=1, lanes={"default": Lane()})
+    api = MyTestApi(base_url=DEFAULT_BASE_URL, scheduler=scheduler)
+    hedge = Hedge()
+    hedge._get_executor()
+
+    with scheduler.slot(None, api.metrics):
+
+        def check():
+            # the parent's slot is not held in the child
+            with scheduler.slot(None, api.metrics):
+                pass
+            return hedge._executor is None
+
+        assert run_in_child(check) == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_it_resets_metrics_after_fork():
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    api.metrics.increment("get_resource.requests")
+
+    def check():
+        api.metrics.increment("get_resource.requests")
+        return api.metrics["get_resource.requests"] == 1
+
+    assert run_in_child(check) == 0
+    assert api.metrics["get_resource.requests"] == 1
+
+
+def test_it_does_not_warm_connections_before_a_fork(
+    mocked_responses: responses.RequestsMock,
+):
+    head = mocked_responses.head(DEFAULT_BASE_URL)
+
+    MyTestApi(base_url=DEFAULT_BASE_URL, warm_connections=2)
+    time.sleep(0.05)
+
+    assert head.call_count == 0
+
+
+def test_it_warms_connections(mocked_responses: responses.RequestsMock):
+    head = mocked_responses.head(DEFAULT_BASE_URL)
+
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    api.warm(connections=3)
+
+    assert head.call_count == 3
+
+
+def test_warming_does_not_raise(mocked_responses: responses.RequestsMock):
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    # no mocked HEAD, so responses raises a ConnectionError
+    api.warm(connections=1)
@@ -0,0 +1,35 @@
+import pytest
+import responses
+
+from slink import Api, head
+from slink.api import Body
+from support import DEFAULT_BASE_URL
+
+
+def test_head_makes_requests(mocked_responses: responses.RequestsMock):
+    resource_key = "test_resource"
+    head_call = mocked_responses.head(
+        f"{DEFAULT_BASE_URL}/resources/{resource_key}",
+        headers={"ETag": '"v1"'},
+    )
+
+    class TestApi(Api):
+        @head("/resources/{my_resource}")
+        def resource_etag(self, my_resource: str):
+            return self.response.headers["ETag"]
+
+    api = TestApi(base_url=DEFAULT_BASE_URL)
+
+    assert api.resource_etag(my_resource=resource_key) == '"v1"'
+    assert head_call.call_count == 1
+
+
+def test_head_does_not_allow_body():
+    with pytest.raises(Exception) as e:
+
+        class TestApi(Api):
+            @head("/resources/{my_resource}", body=Body())
+            def resource_etag(self, my_resource: str, body: dict):
+                pass
+
+    assert "Cannot pass Body() argument to @head" in str(e)
@@ -0,0 +1,163 @@
+import threading
+import time
+import pytest
+import requests
+import responses
+
+from slink import Api, get, Hedge
+from support import DEFAULT_BASE_URL, MyResource
+
+
+def setup_slow_first_response(mocked_responses: responses.RequestsMock, delay: float):
+    calls = []
+    lock = threading.Lock()
+
+    def callback(request):
+        with lock:
+            calls.append(request.url)
+            first = len(calls) == 1
+        if first:
+            time.sleep(delay)
+            return 200, {}, '{"name": "slow", "value": 1}'
+        return 200, {}, '{"name": "fast", "value": 2}'
+
+    mocked_responses.add_callback(
+        responses.GET, f"{DEFAULT_BASE_URL}/rest/api/3/TEST", callback=callback
+    )
+    return calls
+
+
+def test_it_hedges_slow_requests(mocked_responses: responses.RequestsMock):
+    calls = setup_slow_first_response(mocked_responses, delay=0.5)
+
+    class TestApi(Api):
+        @get("rest/api/3/{resource_key}", hedge=Hedge(delay=0.01, budget=1))
+        def get_resource(self, resource_key: str):
+            return MyResource(**self.response.json())
+
+    api = TestApi(base_url=DEFAULT_BASE_URL)
+    result = api.get_resource(resource_key="TEST")
+
+    assert result.name == "fast"
+    assert len(calls) == 2
+    assert api.metrics["get_resource.hedges_sent"] == 1
+    assert api.metrics["get_resource.hedges_won"] == 1
+
+
+def test_it_does_not_hedge_fast_requests(mocked_responses: responses.RequestsMock):
+    get_resource = mocked_responses.get(
+        f"{DEFAULT_BASE_URL}/rest/api/3/TEST", json={"name": "fast", "value": 2}
+    )
+
+    class TestApi(Api):
+        @get("rest/api/3/{resource_key}", hedge=Hedge(delay=5, budget=1))
+        def get_resource(self, resource_key: str):
+            return MyResource(**self.response.json())
+
+    api = TestApi(base_url=DEFAULT_BASE_URL)
+    api.get_resource(resource_key="TEST")
+
+    assert get_resource.call_count == 1
+    assert api.metrics["get_resource.hedges_sent"] == 0
+
+
+def test_it_caps_hedges_to_budget(mocked_responses: responses.RequestsMock):
+    calls = setup_slow_first_response(mocked_responses, delay=0.2)
+
+    class TestApi(Api):
+        @get("rest/api/3/{resource_key}", hedge=Hedge(delay=0.01, budget=0.5))
+        def get_resource(self, resource_key: str):
+            return MyResource(**self.response.json())
+
+    api = TestApi(base_url=DEFAULT_BASE_URL)
+    result = api.get_resource(resource_key="TEST")
+
+    # a single request is not enough budget for a hedge
+    assert result.name == "slow"
+    assert len(calls) == 1
+    assert api.metrics["get_resource.hedges_sent"] == 0
+
+
+def test_hedge_delay_follows_latency_percentile():
+    hedge = Hedge(delay=1, percentile=50, min_samples=4)
+    assert hedge.hedge_delay("get_resource") == 1
+
+    for seconds in [0.1, 0.2, 0.3, 0.4]:
+        hedge._observe("get_resource", seconds)
+
+    assert hedge.hedge_delay("get_resource") == 0.3
+    assert hedge.hedge_delay("other_endpoint") == 1
+
+
+def test_hedge_rejects_invalid_budget():
+    with pytest.raises(ValueError) as e:
+        Hedge(budget=2)
+
+    assert "Hedge budget must be between 0 and 1" in str(e)
+
+
+def test_a_failed_response_does_not_win(mocked_responses: responses.RequestsMock):
+    calls = []
+    lock = threading.Lock()
+
+    def callback(request):
+        with lock:
+            calls.append(request.url)
+            first = len(calls) == 1
+        if first:
+            time.sleep(0.2)
+            return 200, {}, '{"name": "slow", "value": 1}'
+        return 503, {}, ""
+
+    mocked_responses.add_callback(
+        responses.GET, f"{DEFAULT_BASE_URL}/rest/api/3/TEST", callback=callback
+    )
+
+    class TestApi(Api):
+        @get("rest/api/3/{resource_key}", hedge=Hedge(delay=0.01, budget=1))
+        def get_resource(self, resource_key: str):
+            return MyResource(**self.response.json())
+
+    api = TestApi(base_url=DEFAULT_BASE_URL)
+    result = api.get_resource(resource_key="TEST")
+
+    assert result.name == "slow"
+    assert len(calls) == 2
+    assert api.metrics["get_resource.hedges_won"] == 0
+
+
+def test_hedge_budget_is_a_rolling_window():
+    hedge = Hedge(budget=0.5, window=4)
+    for _ in range(4):
+        hedge._recent.append([False])
+    assert hedge._reserve_hedge([False])
+
+    # the window is now all hedged requests, so the earlier quiet period no longer counts
+    for _ in range(4):
+        hedge._recent.append([True])
+    assert not hedge._reserve_hedge([False])
+
+
+def test_concurrent_requests_share_the_hedge_budget():
+    hedge = Hedge(delay=0.01, budget=0.1, max_workers=20)
+    for _ in range(50):
+        hedge._recent.append([False])
+    api = Api(base_url=DEFAULT_BASE_URL)
+
+    def slow_send():
+        time.sleep(0.1)
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+    threads = [
+        threading.Thread(target=hedge.send, args=(api, "get_resource", slow_send))
+        for _ in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # at most 10% of the 70 requests in the window
+    assert 0 < api.metrics["get_resource.hedges_sent"] <= 7
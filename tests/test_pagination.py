@@ -1,13 +1,22 @@
 from ast import Tuple
+import threading
+import time
 from typing import Generator
 import pytest
 import requests
 import responses
 
-from slink import Api, get_pages
+from slink import AdaptivePageSize, Api, get_pages
 from slink.api import PagerGeneratorType, Query
 
-from support import DEFAULT_BASE_URL, setup_page_responses, SimplePager, LinkedPager
+from support import (
+    DEFAULT_BASE_URL,
+    setup_page_responses,
+    setup_sized_page_responses,
+    AdaptivePager,
+    SimplePager,
+    LinkedPager,
+)
 
 
 def test_it_supports_pagination_directly(mocked_responses):
@@ -154,6 +163,25 @@ def test_it_supports_early_termination(mocked_responses):
     assert page_responses[1].call_count == 1
 
 
+def test_page_limit_stops_before_the_next_page(mocked_responses):
+    data = list(range(1, 20))
+    page_responses = setup_page_responses(mocked_responses, DEFAULT_BASE_URL, data)
+
+    class PagedApi(Api):
+        @get_pages("rest/api/3/pages", pager=SimplePager())
+        def get_paginated(self) -> Generator[int, None, None]:
+            for value in self.response.json()["data"]:
+                yield value
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL)
+    with api.page_limit(2):
+        values = list(api.get_paginated())
+
+    assert values == data[:10]
+    assert [r.call_count for r in page_responses] == [1, 1, 0, 0]
+    assert api.metrics["get_paginated.requests"] == 2
+
+
 def test_it_supports_linked_page_iterators(mocked_responses):
     """
     Another style of iterators is the linked page iterator, where the link to the next page is contained in the
@@ -274,3 +302,240 @@ def test_pagers_can_return_none_to_allow_page_url_as_is(generated_cursor_data):
     actual_data = list(api.get_paginated(my_arg="foo"))
 
     assert actual_data == generated_cursor_data
+
+
+def test_adaptive_page_size_grows_while_throughput_holds(mocked_responses):
+    data = list(range(1, 100))
+    requested_sizes = setup_sized_page_responses(
+        mocked_responses, DEFAULT_BASE_URL, data
+    )
+    page_size = AdaptivePageSize("maxCount", minimum=5, maximum=40, factor=2)
+
+    class PagedApi(Api):
+        @get_pages("rest/api/3/pages", pager=AdaptivePager(page_size))
+        def get_paginated(self):
+            for value in self.response.json()["data"]:
+                yield value
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL)
+    actual_results = list(api.get_paginated())
+
+    assert actual_results == data
+    assert requested_sizes[0] == 5
+    assert max(requested_sizes) > 5
+    assert all(5 <= size <= 40 for size in requested_sizes)
+    assert api.metrics["get_paginated.page_size"] == requested_sizes[-1]
+    assert api.metrics["get_paginated.items_per_second"] > 0
+
+
+def test_adaptive_page_size_backs_off_after_server_errors(mocked_responses):
+    data = list(range(1, 20))
+    requested_sizes = setup_sized_page_responses(
+        mocked_responses, DEFAULT_BASE_URL, data, failures=2
+    )
+    page_size = AdaptivePageSize(
+        "maxCount", minimum=2, maximum=20, initial=16, retry_delay=0.05
+    )
+
+    class PagedApi(Api):
+        @get_pages("rest/api/3/pages", pager=AdaptivePager(page_size))
+        def get_paginated(self):
+            for value in self.response.json()["data"]:
+                yield value
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL)
+    start = time.perf_counter()
+    actual_results = list(api.get_paginated())
+
+    assert actual_results == data
+    assert requested_sizes[:3] == [16, 10, 6]
+    assert api.metrics["get_paginated.page_size_backoffs"] == 2
+    # waits 0.05s, then 0.1s, before the retries
+    assert time.perf_counter() - start >= 0.15
+
+
+def test_adaptive_page_size_limits_retries(mocked_responses):
+    requested_sizes = setup_sized_page_responses(
+        mocked_responses, DEFAULT_BASE_URL, list(range(1, 20)), failures=20
+    )
+    page_size = AdaptivePageSize(
+        "maxCount",
+        minimum=10,
+        maximum=1000,
+        initial=1000,
+        max_retries=2,
+        retry_delay=0.01,
+    )
+
+    class PagedApi(Api):
+        @get_pages("rest/api/3/pages", pager=AdaptivePager(page_size))
+        def get_paginated(self):
+            for value in self.response.json()["data"]:
+                yield value
+
+        def check_response(self):
+            self.response.raise_for_status()
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL)
+    with pytest.raises(requests.HTTPError):
+        list(api.get_paginated())
+
+    assert len(requested_sizes) == 3
+    assert api.metrics["get_paginated.page_size_backoffs"] == 2
+
+
+def test_adaptive_page_size_passes_errors_through_at_minimum(mocked_responses):
+    setup_sized_page_responses(
+        mocked_responses, DEFAULT_BASE_URL, list(range(1, 20)), failures=10
+    )
+    page_size = AdaptivePageSize("maxCount", minimum=5, maximum=20)
+
+    class PagedApi(Api):
+        @get_pages("rest/api/3/pages", pager=AdaptivePager(page_size))
+        def get_paginated(self):
+            for value in self.response.json()["data"]:
+                yield value
+
+        def check_response(self):
+            self.response.raise_for_status()
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL)
+    with pytest.raises(requests.HTTPError):
+        list(api.get_paginated())
+
+
+def test_adaptive_page_size_rejects_invalid_bounds():
+    with pytest.raises(ValueError) as e:
+        AdaptivePageSize("maxCount", minimum=10, maximum=5)
+
+    assert "Invalid page size bounds" in str(e)
+
+
+class RecordingPager:
+    def __init__(self) -> None:
+        self.responses: list[requests.Response] = []
+
+    def pages(self, url: str) -> PagerGeneratorType:
+        start_at = 0
+        total = None
+        while total is None or start_at < total:
+            response = yield url, {"startAt": start_at, "maxCount": 5}
+            self.responses.append(response)
+            total = response.json()["total"]
+            start_at += 5
+
+
+def test_bounded_pagination_releases_page_bodies(mocked_responses):
+    data = list(range(1, 20))
+    setup_page_responses(mocked_responses, DEFAULT_BASE_URL, data)
+    pager = RecordingPager()
+    page_sizes = []
+
+    class PagedApi(Api):
+        @get_pages("rest/api/3/pages", pager=pager, bounded=True)
+        def get_paginated(self):
+            page_sizes.append(len(self.response.content))
+            for value in self.response.json()["data"]:
+                yield value
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL)
+    actual_results = []
+    for value in api.get_paginated():
+        # only the current page is buffered
+        assert api.metrics["buffered_bytes"] == page_sizes[-1]
+        actual_results.append(value)
+
+    assert actual_results == data
+    assert len(pager.responses) == 4
+    assert all(response.content == b"" for response in pager.responses)
+    assert api.metrics["buffered_bytes"] == 0
+
+
+def test_bounded_pagination_releases_on_early_termination(mocked_responses):
+    setup_page_responses(mocked_responses, DEFAULT_BASE_URL, list(range(1, 20)))
+
+    class PagedApi(Api):
+        @get_pages("rest/api/3/pages", pager=SimplePager(), bounded=True)
+        def get_paginated(self):
+            for value in self.response.json()["data"]:
+                yield value
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL)
+    values = api.get_paginated()
+    next(values)
+    assert api.metrics["buffered_bytes"] > 0
+
+    values.close()
+
+    assert api.metrics["buffered_bytes"] == 0
+
+
+def test_bounded_pagination_caps_buffered_bytes_across_iterations(mocked_responses):
+    setup_page_responses(mocked_responses, DEFAULT_BASE_URL, list(range(1, 20)))
+
+    class PagedApi(Api):
+        @get_pages("rest/api/3/pages", pager=SimplePager(), bounded=True)
+        def get_paginated(self):
+            for value in self.response.json()["data"]:
+                yield value
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL, max_buffered_bytes=1)
+    first = api.get_paginated()
+    assert next(first) == 1
+
+    second_results = []
+    second = threading.Thread(target=lambda: second_results.extend(api.get_paginated()))
+    second.start()
+    second.join(timeout=0.1)
+    # the first iteration's page is still buffered, so the second has to wait
+    assert second.is_alive()
+    assert second_results == []
+
+    first.close()
+    second.join(timeout=5)
+
+    assert second_results == list(range(1, 20))
+    assert api.metrics["buffered_bytes"] == 0
+
+
+def test_bounded_pagination_interleaves_on_one_thread(mocked_responses):
+    setup_page_responses(mocked_responses, DEFAULT_BASE_URL, list(range(1, 20)))
+
+    class PagedApi(Api):
+        @get_pages("rest/api/3/pages", pager=SimplePager(), bounded=True)
+        def get_paginated(self):
+            for value in self.response.json()["data"]:
+                yield value
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL, max_buffered_bytes=1)
+    pairs = list(zip(api.get_paginated(), api.get_paginated()))
+
+    assert pairs == [(value, value) for value in range(1, 20)]
+    assert api.metrics["buffered_bytes"] == 0
+
+
+def test_adaptive_page_size_does_not_retry_unsized_pages(mocked_responses):
+    failing_page = mocked_responses.get(
+        f"{DEFAULT_BASE_URL}/rest/api/3/pages", status=503
+    )
+
+    class UnsizedPager:
+        page_size = AdaptivePageSize("maxCount", minimum=1, maximum=64, initial=64)
+
+        def pages(self, url: str) -> PagerGeneratorType:
+            yield url, None
+
+    class PagedApi(Api):
+        @get_pages("rest/api/3/pages", pager=UnsizedPager())
+        def get_paginated(self):
+            yield from self.response.json()["data"]
+
+        def check_response(self):
+            self.response.raise_for_status()
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL)
+    with pytest.raises(requests.HTTPError):
+        list(api.get_paginated())
+
+    assert failing_page.call_count == 1
+    assert api.metrics["get_paginated.page_size_backoffs"] == 0
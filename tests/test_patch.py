@@ -0,0 +1,280 @@
+import pytest
+import responses
+
+from slink import Api, Body, ResourceVersion, get, patch
+from slink.diff import json_patch, merge_patch
+from support import DEFAULT_BASE_URL
+
+RESOURCE_URL = f"{DEFAULT_BASE_URL}/resources/test_resource"
+ORIGINAL = {"name": "first", "value": 1, "tags": {"a": 1, "b": 2}}
+
+
+class TrackingApi(Api):
+    @get("/resources/{my_resource}", track=True)
+    def get_resource(self, my_resource: str):
+        return self.response.json()
+
+    @patch("/resources/{my_resource}", resource=Body(), diff="merge")
+    def update_resource(self, my_resource: str, resource: dict):
+        self.response.raise_for_status()
+        return self.response.status_code
+
+    @patch("/resources/{my_resource}", resource=Body(), diff="json-patch")
+    def update_resource_with_json_patch(self, my_resource: str, resource: dict):
+        self.response.raise_for_status()
+
+    @patch(
+        "/resources/{my_resource}", resource=Body(), diff="merge", remove_missing=True
+    )
+    def replace_resource(self, my_resource: str, resource: dict):
+        self.response.raise_for_status()
+
+
+@pytest.fixture
+def tracking_api(mocked_responses: responses.RequestsMock):
+    mocked_responses.get(RESOURCE_URL, json=ORIGINAL, headers={"ETag": '"v1"'})
+    api = TrackingApi(base_url=DEFAULT_BASE_URL)
+    api.get_resource(my_resource="test_resource")
+    return api
+
+
+def test_patch_makes_requests(mocked_responses: responses.RequestsMock):
+    updates = {"name": "second"}
+    patch_call = mocked_responses.patch(
+        RESOURCE_URL, match=[responses.matchers.json_params_matcher(updates)]
+    )
+
+    class TestApi(Api):
+        @patch("/resources/{my_resource}", updates=Body())
+        def update_resource(self, my_resource: str, updates: dict):
+            self.response.raise_for_status()
+
+    api = TestApi(base_url=DEFAULT_BASE_URL)
+    api.update_resource(my_resource="test_resource", updates=updates)
+
+    assert patch_call.call_count == 1
+
+
+def test_patch_sends_only_changed_fields(mocked_responses, tracking_api):
+    patch_call = mocked_responses.patch(
+        RESOURCE_URL,
+        headers={"ETag": '"v2"'},
+        match=[
+            responses.matchers.json_params_matcher({"value": 2}),
+            responses.matchers.header_matcher(
+                {
+                    "If-Match": '"v1"',
+                    "Content-Type": "application/merge-patch+json",
+                }
+            ),
+        ],
+    )
+
+    tracking_api.update_resource(
+        my_resource="test_resource",
+        resource={"name": "first", "value": 2, "tags": {"b": 2}},
+    )
+
+    assert patch_call.call_count == 1
+    assert tracking_api.tracked_version(RESOURCE_URL).etag == '"v2"'
+
+
+def test_patch_sends_json_patch(mocked_responses, tracking_api):
+    patch_call = mocked_responses.patch(
+        RESOURCE_URL,
+        match=[
+            responses.matchers.json_params_matcher(
+                [{"op": "replace", "path": "/name", "value": "second"}]
+            ),
+            responses.matchers.header_matcher(
+                {"Content-Type": "application/json-patch+json"}
+            ),
+        ],
+    )
+
+    tracking_api.update_resource_with_json_patch(
+        my_resource="test_resource", resource={**ORIGINAL, "name": "second"}
+    )
+
+    assert patch_call.call_count == 1
+
+
+def test_patch_skips_unchanged_resources(mocked_responses, tracking_api):
+    patch_call = mocked_responses.patch(RESOURCE_URL)
+
+    status = tracking_api.update_resource(
+        my_resource="test_resource", resource=dict(ORIGINAL)
+    )
+
+    assert patch_call.call_count == 0
+    assert status == 304
+    assert tracking_api.metrics["update_resource.requests"] == 0
+    assert tracking_api.metrics["update_resource.network_seconds"] == 0
+    assert tracking_api.metrics["update_resource.skipped"] == 1
+
+
+def test_patch_diffs_against_what_was_sent(mocked_responses, tracking_api):
+    first = mocked_responses.patch(
+        RESOURCE_URL, match=[responses.matchers.json_params_matcher({"value": 2})]
+    )
+    second = mocked_responses.patch(
+        RESOURCE_URL, match=[responses.matchers.json_params_matcher({"value": 3})]
+    )
+
+    resource = {**ORIGINAL, "tags": dict(ORIGINAL["tags"])}
+    resource["value"] = 2
+    tracking_api.update_resource(my_resource="test_resource", resource=resource)
+    resource["value"] = 3
+    tracking_api.update_resource(my_resource="test_resource", resource=resource)
+
+    assert first.call_count == 1
+    assert second.call_count == 1
+
+
+def test_patch_forgets_versions_on_precondition_failure(mocked_responses, tracking_api):
+    mocked_responses.patch(RESOURCE_URL, status=412)
+
+    with pytest.raises(Exception):
+        tracking_api.update_resource(
+            my_resource="test_resource", resource={**ORIGINAL, "value": 3}
+        )
+
+    assert tracking_api.tracked_version(RESOURCE_URL) is None
+
+
+def test_tracking_ignores_non_json_bodies(mocked_responses: responses.RequestsMock):
+    mocked_responses.get(RESOURCE_URL, body="<html></html>")
+
+    class TestApi(Api):
+        @get("/resources/{my_resource}", track=True)
+        def get_resource(self, my_resource: str):
+            return self.response.text
+
+    api = TestApi(base_url=DEFAULT_BASE_URL)
+
+    assert api.get_resource(my_resource="test_resource") == "<html></html>"
+    assert api.tracked_version(RESOURCE_URL) is None
+
+
+def test_tracked_versions_are_bounded():
+    api = TrackingApi(base_url=DEFAULT_BASE_URL, max_tracked_versions=2)
+    for key in ["a", "b", "c"]:
+        api.track_version(f"{DEFAULT_BASE_URL}/resources/{key}", ResourceVersion({}))
+
+    assert api.tracked_version(f"{DEFAULT_BASE_URL}/resources/a") is None
+    assert api.tracked_version(f"{DEFAULT_BASE_URL}/resources/c") is not None
+
+    api.forget_versions()
+
+    assert api.tracked_version(f"{DEFAULT_BASE_URL}/resources/c") is None
+
+
+def test_patch_sends_whole_untracked_resources(mocked_responses):
+    resource = {"name": "first", "value": 1}
+    patch_call = mocked_responses.patch(
+        RESOURCE_URL, match=[responses.matchers.json_params_matcher(resource)]
+    )
+
+    api = TrackingApi(base_url=DEFAULT_BASE_URL)
+    api.update_resource(my_resource="test_resource", resource=resource)
+
+    assert patch_call.call_count == 1
+
+
+def test_patch_raises_exception_for_unknown_diff():
+    with pytest.raises(Exception) as e:
+
+        class TestApi(Api):
+            @patch("rest/api/3", body=Body(), diff="xml")
+            def update_resource(self, body: dict):
+                pass
+
+    assert "Unknown diff 'xml' for @patch" in str(e)
+
+
+def test_patch_leaves_fields_missing_from_the_body(mocked_responses):
+    # a model that only knows some of the server's fields
+    mocked_responses.get(
+        RESOURCE_URL, json={"name": "first", "value": 1, "id": 7, "owner": "me"}
+    )
+    patch_call = mocked_responses.patch(
+        RESOURCE_URL, match=[responses.matchers.json_params_matcher({"value": 42})]
+    )
+    api = TrackingApi(base_url=DEFAULT_BASE_URL)
+    api.get_resource(my_resource="test_resource")
+
+    api.update_resource(
+        my_resource="test_resource", resource={"name": "first", "value": 42}
+    )
+
+    assert patch_call.call_count == 1
+    assert api.tracked_version(RESOURCE_URL).document == {
+        "name": "first",
+        "value": 42,
+        "id": 7,
+        "owner": "me",
+    }
+    # nothing left to change
+    assert (
+        api.update_resource(my_resource="test_resource", resource={"value": 42}) == 304
+    )
+
+
+def test_patch_removes_missing_fields_when_asked(mocked_responses, tracking_api):
+    patch_call = mocked_responses.patch(
+        RESOURCE_URL,
+        match=[
+            responses.matchers.json_params_matcher({"name": None, "tags": {"a": None}})
+        ],
+    )
+
+    tracking_api.replace_resource(
+        my_resource="test_resource", resource={"value": 1, "tags": {"b": 2}}
+    )
+
+    assert patch_call.call_count == 1
+
+
+def test_merge_patch_rejects_null_values(mocked_responses, tracking_api):
+    with pytest.raises(ValueError) as e:
+        tracking_api.update_resource(
+            my_resource="test_resource", resource={"name": None}
+        )
+
+    assert "to null with a JSON Merge Patch" in str(e.value)
+
+
+def test_json_patch_sets_null_values(mocked_responses, tracking_api):
+    patch_call = mocked_responses.patch(
+        RESOURCE_URL,
+        match=[
+            responses.matchers.json_params_matcher(
+                [{"op": "replace", "path": "/name", "value": None}]
+            )
+        ],
+    )
+
+    tracking_api.update_resource_with_json_patch(
+        my_resource="test_resource", resource={"name": None}
+    )
+
+    assert patch_call.call_count == 1
+
+
+def test_merge_patch():
+    assert merge_patch({"a": 1, "b": {"c": 2}}, {"b": {"d": 3}}) == {"b": {"d": 3}}
+    assert merge_patch(
+        {"a": 1, "b": {"c": 2}}, {"a": 1, "b": {"d": 3}}, remove_missing=True
+    ) == {"b": {"c": None, "d": 3}}
+    assert merge_patch({"a": [1]}, {"a": [1, 2]}) == {"a": [1, 2]}
+
+
+def test_json_patch_escapes_paths():
+    assert json_patch({"a/b": 1, "c~": 2}, {"a/b": 2}, remove_missing=True) == [
+        {"op": "remove", "path": "/c~0"},
+        {"op": "replace", "path": "/a~1b", "value": 2},
+    ]
+    assert json_patch({"a/b": 1, "c~": 2}, {"a/b": 2}) == [
+        {"op": "replace", "path": "/a~1b", "value": 2},
+    ]
+    assert json_patch({"a": 1}, {"a": 1}) == []
@@ -0,0 +1,129 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+import pytest
+import responses
+from slink import Api, Projection, get, get_pages
+from support import DEFAULT_BASE_URL, SimplePager
+
+
+class Address(BaseModel):
+    city: str
+
+
+class Person(BaseModel):
+    name: str
+    addresses: List[Address]
+    home: Address = Field(alias="homeAddress")
+
+
+FULL_PERSON = {
+    "name": "test_name",
+    "age": 42,
+    "addresses": [{"city": "Sydney", "postcode": "2000"}],
+    "homeAddress": {"city": "Perth", "postcode": "6000"},
+}
+
+
+def test_projection_fields_follow_the_model():
+    projection = Projection(model=Person)
+
+    assert projection.value == "name,addresses.city,homeAddress.city"
+    assert projection.project(FULL_PERSON) == {
+        "name": "test_name",
+        "addresses": [{"city": "Sydney"}],
+        "homeAddress": {"city": "Perth"},
+    }
+
+
+class Employee(BaseModel):
+    name: str
+    manager: Optional["Employee"]
+    offices: Dict[str, Address]
+
+
+Employee.update_forward_refs()
+
+
+def test_projection_requests_recursive_and_mapped_models_whole():
+    projection = Projection(model=Employee)
+    employee = {
+        "name": "test_name",
+        "age": 42,
+        "manager": {"name": "boss", "manager": None, "offices": {}},
+        "offices": {"hq": {"city": "Perth", "postcode": "6000"}},
+    }
+
+    assert projection.value == "name,manager,offices"
+    assert projection.project(employee) == {
+        "name": "test_name",
+        "manager": {"name": "boss", "manager": None, "offices": {}},
+        "offices": {"hq": {"city": "Perth", "postcode": "6000"}},
+    }
+
+
+def test_it_adds_projections_to_the_query(mocked_responses: responses.RequestsMock):
+    get_person = mocked_responses.get(
+        f"{DEFAULT_BASE_URL}/people/1",
+        json=FULL_PERSON,
+        match=[
+            responses.matchers.query_param_matcher(
+                {"$select": "name,addresses/city,homeAddress/city"}
+            )
+        ],
+    )
+
+    class TestApi(Api):
+        @get(
+            "people/{person_id}",
+            select=Projection(model=Person, alias="$select", nested_separator="/"),
+        )
+        def get_person(self, person_id: int):
+            projected = self.project(self.response.json())
+            assert "age" not in projected
+            return Person(**projected)
+
+    api = TestApi(base_url=DEFAULT_BASE_URL)
+    person = api.get_person(person_id=1)
+
+    assert get_person.call_count == 1
+    assert person.home.city == "Perth"
+
+
+def test_it_projects_pages(mocked_responses: responses.RequestsMock):
+    data = [{"value": i, "extra": "unused"} for i in range(1, 20)]
+    for i in range(0, 20, 5):
+        mocked_responses.get(
+            f"{DEFAULT_BASE_URL}/rest/api/3/pages",
+            json={"data": data[i : i + 5], "total": len(data)},
+            match=[
+                responses.matchers.query_param_matcher(
+                    {"startAt": i, "maxCount": 5, "fields": "value"}
+                )
+            ],
+        )
+
+    class PagedApi(Api):
+        @get_pages(
+            "rest/api/3/pages", pager=SimplePager(), fields=Projection(["value"])
+        )
+        def get_paginated(self):
+            yield from self.project(self.response.json()["data"])
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL)
+
+    assert list(api.get_paginated()) == [{"value": i} for i in range(1, 20)]
+
+
+def test_it_raises_exception_for_multiple_projections():
+    with pytest.raises(Exception) as e:
+
+        class TestApi(Api):
+            @get(
+                "people/{person_id}",
+                fields=Projection(["name"]),
+                expand=Projection(["addresses"]),
+            )
+            def get_person(self, person_id: int):
+                pass
+
+    assert "Can only have one Projection() argument" in str(e)
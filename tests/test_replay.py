@@ -0,0 +1,153 @@
+import time
+import pytest
+import requests
+import responses
+
+from slink import Api, Cassette, ReplayAdapter, get_pages
+from support import (
+    DEFAULT_BASE_URL,
+    MyTestApi,
+    SimplePager,
+    setup_page_responses,
+)
+
+
+class PagedApi(Api):
+    @get_pages("rest/api/3/pages", pager=SimplePager())
+    def get_paginated(self):
+        for value in self.response.json()["data"]:
+            yield int(value)
+
+
+def test_it_records_and_replays_pages(mocked_responses, tmp_path):
+    data = list(range(1, 20))
+    setup_page_responses(mocked_responses, DEFAULT_BASE_URL, data)
+    cassette_path = str(tmp_path / "pages.json.gz")
+
+    api = PagedApi(base_url=DEFAULT_BASE_URL)
+    with api.record(cassette_path) as cassette:
+        recorded = list(api.get_paginated())
+    mocked_responses.reset()
+
+    replaying_api = PagedApi(base_url=DEFAULT_BASE_URL)
+    replaying_api.replay(cassette_path)
+    replayed = list(replaying_api.get_paginated())
+
+    assert recorded == data
+    assert replayed == data
+    assert len(cassette.interactions) == 4
+
+
+def test_it_replays_request_bodies(mocked_responses, tmp_path):
+    mocked_responses.post(
+        f"{DEFAULT_BASE_URL}/rest/api/3/TEST",
+        json={"name": "first", "value": 1},
+        match=[responses.matchers.json_params_matcher({"foo": "bar"})],
+    )
+    mocked_responses.post(
+        f"{DEFAULT_BASE_URL}/rest/api/3/TEST",
+        json={"name": "second", "value": 2},
+        match=[responses.matchers.json_params_matcher({"foo": "baz"})],
+    )
+    cassette_path = str(tmp_path / "bodies.json")
+
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    with api.record(cassette_path):
+        api.post_resource(resource_key="TEST", body={"foo": "bar"})
+        api.post_resource(resource_key="TEST", body={"foo": "baz"})
+    mocked_responses.reset()
+
+    api.replay(cassette_path)
+
+    assert api.post_resource(resource_key="TEST", body={"foo": "baz"}).name == "second"
+    assert api.post_resource(resource_key="TEST", body={"foo": "bar"}).name == "first"
+
+
+def test_it_raises_for_unrecorded_requests():
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    api.replay(Cassette())
+
+    with pytest.raises(requests.ConnectionError) as e:
+        api.get_resource(resource_key="TEST")
+
+    assert "No recorded response for 'GET http://example.com/rest/api/3/TEST'" in str(e)
+
+
+def make_cassette(mocked_responses) -> Cassette:
+    mocked_responses.get(
+        f"{DEFAULT_BASE_URL}/rest/api/3/TEST", json={"name": "test", "value": 1}
+    )
+    cassette = Cassette()
+    session = requests.Session()
+    response = session.get(f"{DEFAULT_BASE_URL}/rest/api/3/TEST")
+    cassette.record(response.request, response)
+    mocked_responses.reset()
+    return cassette
+
+
+def test_it_injects_latency(mocked_responses):
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    api.replay(make_cassette(mocked_responses), latency=lambda rng: 0.05)
+
+    start = time.perf_counter()
+    api.get_resource(resource_key="TEST")
+
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_it_injects_errors(mocked_responses):
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    api.replay(make_cassette(mocked_responses), error_rate=1, error_status=502)
+
+    assert api.session.get(f"{DEFAULT_BASE_URL}/rest/api/3/TEST").status_code == 502
+
+
+def test_it_times_out_slow_responses(mocked_responses):
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    api.replay(make_cassette(mocked_responses), latency=1)
+
+    with pytest.raises(requests.ReadTimeout):
+        api.session.get(f"{DEFAULT_BASE_URL}/rest/api/3/TEST", timeout=0.01)
+
+
+def test_injected_errors_do_not_use_up_responses(mocked_responses, tmp_path):
+    mocked_responses.get(
+        f"{DEFAULT_BASE_URL}/rest/api/3/TEST", json={"name": "first", "value": 1}
+    )
+    mocked_responses.get(
+        f"{DEFAULT_BASE_URL}/rest/api/3/TEST", json={"name": "second", "value": 2}
+    )
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    with api.record(str(tmp_path / "two.json")) as cassette:
+        api.get_resource(resource_key="TEST")
+        api.get_resource(resource_key="TEST")
+    mocked_responses.reset()
+
+    adapter = api.replay(cassette, error_rate=1)
+    assert api.session.get(f"{DEFAULT_BASE_URL}/rest/api/3/TEST").status_code == 503
+    adapter.error_rate = 0
+
+    assert api.get_resource(resource_key="TEST").name == "first"
+    assert api.get_resource(resource_key="TEST").name == "second"
+
+
+def test_it_stops_replaying(mocked_responses):
+    api = MyTestApi(base_url=DEFAULT_BASE_URL)
+    api.replay(Cassette())
+    api.stop_replaying()
+    mocked_responses.get(
+        f"{DEFAULT_BASE_URL}/rest/api/3/TEST", json={"name": "live", "value": 1}
+    )
+
+    assert api.get_resource(resource_key="TEST").name == "live"
+    with pytest.raises(Exception) as e:
+        api.stop_replaying()
+
+    assert "Not replaying" in str(e)
+
+
+def test_it_rejects_unknown_latency():
+    with pytest.raises(ValueError) as e:
+        ReplayAdapter(Cassette(), latency="recroded")
+
+    assert "Replay latency must be a number, a function or 'recorded'" in str(e)
@@ -0,0 +1,181 @@
+import threading
+import time
+import pytest
+import responses
+
+from slink import Api, Lane, Metrics, Scheduler, get
+from support import DEFAULT_BASE_URL, MyResource
+
+
+def start_waiting(scheduler: Scheduler, lane: str, metrics: Metrics, order: list):
+    def run():
+        with scheduler.slot(lane, metrics):
+            order.append(lane)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    while not metrics[f"lane.{lane}.queue_depth"]:
+        time.sleep(0.001)
+    return thread
+
+
+def test_higher_priority_lanes_go_first():
+    scheduler = Scheduler(
+        capacity=1,
+        lanes={"interactive": Lane(priority=1), "batch": Lane()},
+        default_lane="batch",
+    )
+    metrics = Metrics()
+    order: list[str] = []
+
+    with scheduler.slot("batch", metrics):
+        batch = start_waiting(scheduler, "batch", metrics, order)
+        interactive = start_waiting(scheduler, "interactive", metrics, order)
+    batch.join()
+    interactive.join()
+
+    assert order == ["interactive", "batch"]
+    assert metrics["lane.batch.requests"] == 2
+    assert metrics["lane.interactive.requests"] == 1
+    assert metrics["lane.interactive.queue_depth"] == 0
+
+
+def test_lower_priority_lanes_get_their_share():
+    scheduler = Scheduler(
+        capacity=1,
+        lanes={"interactive": Lane(priority=1), "batch": Lane()},
+        default_lane="batch",
+    )
+    metrics = Metrics()
+    order: list[str] = []
+
+    with scheduler.slot("batch", metrics):
+        threads = [
+            start_waiting(scheduler, lane, metrics, order)
+            for lane in ["interactive", "batch", "interactive", "batch", "interactive"]
+        ]
+        while (
+            metrics["lane.interactive.queue_depth"] + metrics["lane.batch.queue_depth"]
+            < 5
+        ):
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+
+    assert order == ["interactive", "interactive", "batch", "interactive", "batch"]
+
+
+def test_lanes_share_connections_by_weight():
+    scheduler = Scheduler(
+        capacity=1,
+        lanes={"interactive": Lane(weight=2), "batch": Lane()},
+        default_lane="batch",
+    )
+    metrics = Metrics()
+    order: list[str] = []
+
+    with scheduler.slot("batch", metrics):
+        threads = [
+            start_waiting(scheduler, lane, metrics, order)
+            for lane in ["batch", "batch", "interactive", "interactive", "interactive"]
+        ]
+        while (
+            metrics["lane.interactive.queue_depth"] + metrics["lane.batch.queue_depth"]
+            < 5
+        ):
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+
+    assert order == ["interactive", "interactive", "batch", "interactive", "batch"]
+
+
+def test_reserved_capacity_is_kept_for_its_lane():
+    scheduler = Scheduler(
+        capacity=2,
+        lanes={"interactive": Lane(reserved=1), "batch": Lane()},
+        default_lane="batch",
+    )
+    metrics = Metrics()
+    order: list[str] = []
+
+    with scheduler.slot("batch", metrics):
+        batch = start_waiting(scheduler, "batch", metrics, order)
+        with scheduler.slot("interactive", metrics):
+            pass
+        assert order == []
+        assert metrics["lane.batch.queue_depth"] == 1
+        assert metrics["lane.interactive.requests"] == 1
+    batch.join()
+
+    assert order == ["batch"]
+
+
+def test_lane_limits_concurrency():
+    scheduler = Scheduler(capacity=4, lanes={"default": Lane(limit=1)})
+    metrics = Metrics()
+    order: list[str] = []
+
+    with scheduler.slot(None, metrics):
+        waiting = start_waiting(scheduler, "default", metrics, order)
+        assert order == []
+    waiting.join()
+
+    assert order == ["default"]
+
+
+def test_it_schedules_endpoints_by_lane(mocked_responses: responses.RequestsMock):
+    mocked_responses.get(
+        f"{DEFAULT_BASE_URL}/rest/api/3/TEST", json={"name": "test", "value": 1}
+    )
+
+    class TestApi(Api):
+        @get("rest/api/3/{resource_key}", lane="batch")
+        def get_resource(self, resource_key: str):
+            return MyResource(**self.response.json())
+
+    scheduler = Scheduler(
+        lanes={"interactive": Lane(priority=1, reserved=2), "batch": Lane(limit=6)},
+        default_lane="batch",
+    )
+    api = TestApi(base_url=DEFAULT_BASE_URL, scheduler=scheduler)
+    api.get_resource(resource_key="TEST")
+    with api.lane("interactive"):
+        api.get_resource(resource_key="TEST")
+
+    assert api.metrics["lane.batch.requests"] == 1
+    assert api.metrics["lane.interactive.requests"] == 1
+    assert api.metrics["lane.interactive.wait_seconds"] >= 0
+
+
+def test_it_raises_for_unknown_lanes(mocked_responses: responses.RequestsMock):
+    class TestApi(Api):
+        @get("rest/api/3/{resource_key}", lane="missing")
+        def get_resource(self, resource_key: str):
+            return MyResource(**self.response.json())
+
+    api = TestApi(base_url=DEFAULT_BASE_URL, scheduler=Scheduler())
+    with pytest.raises(Exception) as e:
+        api.get_resource(resource_key="TEST")
+
+    assert "Unknown lane 'missing'" in str(e)
+
+
+def test_scheduler_rejects_over_reservation():
+    with pytest.raises(ValueError) as e:
+        Scheduler(capacity=2, lanes={"default": Lane(reserved=3)})
+
+    assert "Lanes reserve more connections than the scheduler capacity" in str(e)
+
+
+def test_scheduler_rejects_reserving_everything_for_some_lanes():
+    with pytest.raises(ValueError) as e:
+        Scheduler(
+            capacity=2,
+            lanes={"interactive": Lane(reserved=2), "batch": Lane()},
+            default_lane="batch",
+        )
+
+    assert "leaving none for lanes without a reservation" in str(e)
+    # every lane having a reservation is fine
+    Scheduler(capacity=2, lanes={"default": Lane(reserved=2)})